@@ -1,7 +1,22 @@
 from django.contrib import admin
-from .models import Critic, Vote, Watchlist, Masterpiece
+from .models import (
+    Critic,
+    ExportJob,
+    Vote,
+    Watchlist,
+    Masterpiece,
+    MovieRating,
+    Tag,
+    TMDBCache,
+    UserStats,
+)
 
 admin.site.register(Critic)
 admin.site.register(Vote)
 admin.site.register(Watchlist)
-admin.site.register(Masterpiece)
\ No newline at end of file
+admin.site.register(Masterpiece)
+admin.site.register(MovieRating)
+admin.site.register(Tag)
+admin.site.register(TMDBCache)
+admin.site.register(UserStats)
+admin.site.register(ExportJob)
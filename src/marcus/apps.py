@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class MarcusConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'marcus'
+
+    def ready(self):
+        from .services import SearchService
+
+        # Critics full-text index (FTS5 virtual table, not a model)
+        post_migrate.connect(SearchService.create_table, sender=self)
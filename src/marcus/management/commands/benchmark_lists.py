@@ -0,0 +1,137 @@
+import io
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from marcus.models import Masterpiece, TMDBCache, Watchlist
+from marcus.tmdb_standin import TMDBStandinServer
+
+ENDPOINTS = {"masterpieces": Masterpiece, "watchlists": Watchlist}
+STATES = ("cold", "cached", "denormalized")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure throughput and p50/p95/p99 latency of /api/masterpieces and "
+        "/api/watchlists per page size and TMDB cache state. Runs on a throwaway "
+        "test database against the bundled TMDB stand-in (or --tmdb-url)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--page-sizes", default="10,20,50")
+        parser.add_argument("--states", default=",".join(STATES))
+        parser.add_argument("--latency-ms", type=int, default=50)
+        parser.add_argument("--jitter-ms", type=int, default=20)
+        parser.add_argument("--error-rate", type=float, default=0)
+        parser.add_argument(
+            "--tmdb-url", default=None, help="Benchmark against this TMDB instead"
+        )
+
+    def handle(self, *args, **options):
+        page_sizes = [int(size) for size in options["page_sizes"].split(",")]
+        states = options["states"].split(",")
+
+        standin = None
+        tmdb_url = options["tmdb_url"]
+        if tmdb_url is None:
+            standin = TMDBStandinServer(
+                latency=options["latency_ms"],
+                jitter=options["jitter_ms"],
+                error_rate=options["error_rate"],
+            ).start()
+            tmdb_url = standin.url
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            with override_settings(TMDB_BASE_URL=tmdb_url):
+                self.seed(rows=options["rows"])
+                self.stdout.write(
+                    f"{'endpoint':<14}{'state':<14}{'size':>6}{'req/s':>9}"
+                    f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+                )
+                for state in states:
+                    self.prepare(state=state)
+                    for endpoint in ENDPOINTS:
+                        for page_size in page_sizes:
+                            self.run(
+                                endpoint=endpoint,
+                                state=state,
+                                page_size=page_size,
+                                requests=options["requests"],
+                                rows=options["rows"],
+                            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            if standin is not None:
+                standin.stop()
+
+    def seed(self, *, rows: int):
+        users = [
+            User.objects.create_user(username=f"benchmark{index}") for index in range(5)
+        ]
+        for model in ENDPOINTS.values():
+            model.objects.bulk_create(
+                model(
+                    user=users[index % len(users)],
+                    movie_id=index + 1,
+                    movie_name=f"movie {index + 1}",
+                    platform="tv" if index % 4 == 0 else "movie",
+                    tags="Action,Drame",
+                )
+                for index in range(rows)
+            )
+
+    def prepare(self, *, state: str):
+        """
+        cold : no TMDB cache, cached : TMDB cache filled, denormalized : details on rows
+        """
+        cache.clear()
+        for model in ENDPOINTS.values():
+            model.objects.update(details_updated_at=None)
+        if state == "cold":
+            TMDBCache.objects.all().delete()
+        if state in ("cached", "denormalized"):
+            call_command("refresh_movie_details", stdout=io.StringIO())
+        if state == "cached":
+            for model in ENDPOINTS.values():
+                model.objects.update(details_updated_at=None)
+
+    def run(
+        self, *, endpoint: str, state: str, page_size: int, requests: int, rows: int
+    ):
+        client = Client()
+        pages = max(rows // page_size, 1)
+        latencies = []
+        errors = 0
+        for index in range(requests):
+            if state == "cold":
+                TMDBCache.objects.all().delete()
+                cache.clear()
+            started = time.perf_counter()
+            response = client.get(
+                f"/api/{endpoint}",
+                {"page": index % pages + 1, "page_size": page_size},
+            )
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code != 200
+
+        percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        self.stdout.write(
+            f"{endpoint:<14}{state:<14}{page_size:>6}"
+            f"{len(latencies) / sum(latencies):>9.1f}"
+            f"{percentiles[49] * 1000:>9.1f}"
+            f"{percentiles[94] * 1000:>9.1f}"
+            f"{percentiles[98] * 1000:>9.1f}"
+            + (f"  ({errors} errors)" if errors else "")
+        )
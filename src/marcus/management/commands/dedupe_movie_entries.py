@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from marcus.models import Critic, Masterpiece, Vote, Watchlist
+from marcus.services import RatingService, SearchService, UserStatsService
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete duplicate (user, movie_id) movie entries, keeping the oldest one, "
+        "then recount the stats & ratings they changed. Run before migrating the "
+        "unique constraint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only report the duplicates"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        users = set()
+        keys = set()
+        for model in (Masterpiece, Watchlist, Vote, Critic):
+            groups = (
+                model.objects.exclude(user=None)
+                .order_by()
+                .values("user_id", "movie_id")
+                .annotate(count=Count("pk"))
+                .filter(count__gt=1)
+                .values_list("user_id", "movie_id")
+            )
+            duplicates = []
+            for user_id, movie_id in groups.iterator(chunk_size=batch_size):
+                rows = model.objects.filter(user_id=user_id, movie_id=movie_id)
+                # Oldest row kept
+                duplicates += rows.order_by("created_at", "pk")[1:]
+                users.add(user_id)
+            keys.update((row.platform, row.movie_id) for row in duplicates)
+            if not options["dry_run"]:
+                for index in range(0, len(duplicates), batch_size):
+                    batch = duplicates[index : index + batch_size]
+                    with transaction.atomic():
+                        if model is Critic:
+                            SearchService.unindex(critics=batch)
+                        # Tag links go with the rows
+                        model.objects.filter(pk__in=[row.pk for row in batch]).delete()
+            self.stdout.write(f"{model.__name__} : {len(duplicates)} duplicates")
+        if options["dry_run"] or not users:
+            return
+        UserStatsService.recompute(
+            users=User.objects.filter(pk__in=users), batch_size=batch_size
+        )
+        RatingService.recompute(keys=list(keys), batch_size=batch_size)
+        self.stdout.write(f"{len(users)} users & {len(keys)} titles recomputed")
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from marcus.services import ExportService
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued export jobs (oldest first) and expire old export files. "
+        "Keep one or more running next to the web server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Empty the queue once, then exit"
+        )
+        parser.add_argument(
+            "--interval", type=float, default=2, help="Seconds between queue polls"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                expired, timed_out = ExportService.expire()
+            except Exception as e:
+                # Retried at the next poll : the queue keeps running
+                self.stderr.write(f"While expiring exports : {e}")
+            else:
+                if expired or timed_out:
+                    self.stdout.write(
+                        f"{expired} exports expired, {timed_out} timed out"
+                    )
+            while (job := ExportService.claim()) is not None:
+                ExportService.run(job=job)
+                job.refresh_from_db(fields=["status"])
+                self.stdout.write(f"Export {job.pk} ({job.kind}) {job.status}")
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from marcus.models import Critic
+from marcus.services import SearchService
+from marcus_music.models import Critic as MusicCritic
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text index of movie & music critics. Run once after "
+        "migrating, then to repair it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            self.stderr.write("Full-text search needs SQLite (FTS5), skipped")
+            return
+        batch_size = options["batch_size"]
+        SearchService.create_table()
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM critic_search")
+            for kind, model, fields in (
+                ("movie", Critic, ("pk", "movie_name", "content")),
+                ("music", MusicCritic, ("pk", "album_name", "artist_name", "content")),
+            ):
+                indexed = 0
+                last_pk = None
+                while True:
+                    rows = model.objects.only(*fields).order_by("pk")
+                    if last_pk is not None:
+                        rows = rows.filter(pk__gt=last_pk)
+                    rows = list(rows[:batch_size])
+                    if not rows:
+                        break
+                    last_pk = rows[-1].pk
+                    SearchService.index(kind=kind, critics=rows)
+                    indexed += len(rows)
+                self.stdout.write(f"{kind} : {indexed} critics indexed")
+        # Merge the index b-trees once written
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO critic_search(critic_search) VALUES ('optimize')"
+            )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from marcus.services import RatingService, TMDBService
+
+
+class Command(BaseCommand):
+    help = (
+        "Aggregate votes (count, sum, histogram), critics and masterpieces of every "
+        "title into MovieRating. Run once after migrating, then to repair drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--ids", default=None, help="Only these titles, e.g. movie:1,tv:2"
+        )
+
+    def handle(self, *args, **options):
+        keys = None
+        if options["ids"]:
+            keys = TMDBService.parse_keys(ids=options["ids"], maximum=10000)
+        total = RatingService.recompute(keys=keys, batch_size=options["batch_size"])
+        self.stdout.write(f"{total} titles recomputed")
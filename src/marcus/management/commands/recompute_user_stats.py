@@ -0,0 +1,26 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from marcus.services import UserStatsService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount critics, masterpieces, watchlists and votes (movies + music) of "
+        "every user into UserStats. Run once after migrating, then to repair drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--user", type=int, action="append", help="Only this user id (repeatable)"
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options["user"]:
+            users = users.filter(pk__in=options["user"])
+        total = UserStatsService.recompute(
+            users=users, batch_size=options["batch_size"]
+        )
+        self.stdout.write(f"{total} users recomputed")
@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from marcus.models import Critic, Masterpiece, Vote, Watchlist
+from marcus.services import TMDBService
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill TMDB details stored on masterpieces, watchlists, votes and "
+        "critics. Meant to be scheduled (cron) with --older-than to keep them fresh."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=None,
+            help="Also refresh rows whose details are older than this many days",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        query = Q(details_updated_at__isnull=True)
+        if options["older_than"] is not None:
+            limit = timezone.now() - timedelta(days=options["older_than"])
+            query |= Q(details_updated_at__lt=limit)
+
+        for model in (Masterpiece, Watchlist, Vote, Critic):
+            updated = 0
+            last_pk = None
+            while True:
+                rows = model.objects.filter(query).order_by("pk")
+                if last_pk is not None:
+                    rows = rows.filter(pk__gt=last_pk)
+                rows = list(rows[:batch_size])
+                if not rows:
+                    break
+                last_pk = rows[-1].pk
+
+                details, degraded = TMDBService.prefetch(
+                    keys=[(row.platform, row.movie_id) for row in rows]
+                )
+                # Rows TMDB could not provide are left for the next run
+                rows = [
+                    row
+                    for row in rows
+                    if (row.platform, row.movie_id) in details.keys() - degraded
+                ]
+
+                now = timezone.now()
+                for row in rows:
+                    fields = TMDBService.project(
+                        platform=row.platform,
+                        response=details[(row.platform, row.movie_id)],
+                    )
+                    row.released_date = fields["released_date"]
+                    row.poster_path = fields["poster_path"]
+                    row.synopsis = fields["synopsis"]
+                    row.backdrop_path = fields["backdrop_path"]
+                    row.director = fields.get("director")
+                    row.details_updated_at = now
+                model.objects.bulk_update(
+                    rows,
+                    [
+                        "released_date",
+                        "poster_path",
+                        "synopsis",
+                        "backdrop_path",
+                        "director",
+                        "details_updated_at",
+                    ],
+                )
+                updated += len(rows)
+            self.stdout.write(f"{model.__name__} : {updated} rows updated")
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from marcus.models import Critic, Masterpiece, Vote, Watchlist
+from marcus.services import TagService
+from marcus_music.models import MusicBaseModel
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the tag index of movies (tags) and music (genders) from their "
+        "comma separated field. Run once after migrating, then to repair it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        sources = [
+            (Masterpiece, "tags"),
+            (Watchlist, "tags"),
+            (Vote, "tags"),
+            (Critic, "tags"),
+            # Every music entry at once (genders live on the shared parent table)
+            (MusicBaseModel, "genders"),
+        ]
+        for model, source in sources:
+            indexed = 0
+            last_pk = None
+            while True:
+                rows = model.objects.only("pk", source).order_by("pk")
+                if last_pk is not None:
+                    rows = rows.filter(pk__gt=last_pk)
+                rows = list(rows[:batch_size])
+                if not rows:
+                    break
+                last_pk = rows[-1].pk
+                TagService.link(objects=rows, source=source, replace=True)
+                indexed += len(rows)
+            self.stdout.write(f"{model.__name__} : {indexed} rows indexed")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from marcus.tmdb_standin import FIXTURE, TMDBStandinServer
+
+
+class Command(BaseCommand):
+    help = "Run a local TMDB stand-in (point TMDB_BASE_URL at it)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8001)
+        parser.add_argument("--fixture", default=FIXTURE)
+        parser.add_argument("--latency-ms", type=int, default=0)
+        parser.add_argument("--jitter-ms", type=int, default=0)
+        parser.add_argument("--error-rate", type=float, default=0)
+        parser.add_argument(
+            "--strict", action="store_true", help="404 on ids missing from the fixture"
+        )
+
+    def handle(self, *args, **options):
+        server = TMDBStandinServer(
+            (options["host"], options["port"]),
+            fixture=options["fixture"],
+            latency=options["latency_ms"],
+            jitter=options["jitter_ms"],
+            error_rate=options["error_rate"],
+            strict=options["strict"],
+        )
+        self.stdout.write(f"TMDB stand-in listening on {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,82 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from marcus.models import Critic, Masterpiece, TMDBCache, Vote, Watchlist
+from marcus.services import TMDBService
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the TMDB cache with every title of masterpieces, watchlists, votes "
+        "and critics : titles active on the most recent day first, the most "
+        "popular first within a day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rate", type=float, default=20, help="Maximum TMDB requests per second"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "TMDB_MAX_WORKERS", 8),
+            help="Titles fetched in parallel per batch",
+        )
+        parser.add_argument("--limit", type=int, default=None)
+        parser.add_argument(
+            "--force", action="store_true", help="Also refetch titles already fresh"
+        )
+
+    def handle(self, *args, **options):
+        language = getattr(settings, "TMDB_LANGUAGE", "fr")
+        titles = {}
+        for model in (Masterpiece, Watchlist, Vote, Critic):
+            rows = model.objects.values("platform", "movie_id").annotate(
+                latest=Max("created_at"), count=Count("id")
+            )
+            for row in rows:
+                key = (row["platform"], row["movie_id"])
+                latest, count = titles.get(key, (row["latest"], 0))
+                titles[key] = (max(latest, row["latest"]), count + row["count"])
+        # Day of the latest activity, then number of rows, then latest activity
+        keys = sorted(
+            titles,
+            key=lambda key: (
+                timezone.localtime(titles[key][0]).date(),
+                titles[key][1],
+                titles[key][0],
+            ),
+            reverse=True,
+        )
+
+        if not options["force"]:
+            ttl = getattr(settings, "TMDB_CACHE_TTL", 60 * 60 * 24)
+            fresh = set(
+                TMDBCache.objects.filter(
+                    language=language,
+                    fetched_at__gt=timezone.now() - timedelta(seconds=ttl),
+                ).values_list("platform", "movie_id")
+            )
+            keys = [key for key in keys if key not in fresh]
+        keys = keys[: options["limit"]]
+
+        warmed = 0
+        batch_size = options["batch_size"]
+        for index in range(0, len(keys), batch_size):
+            batch = set(keys[index : index + batch_size])
+            started = time.monotonic()
+            warmed += len(TMDBService.resolve(keys=batch, language=language))
+            # Stay under --rate requests per second
+            time.sleep(
+                max(len(batch) / options["rate"] - (time.monotonic() - started), 0)
+            )
+
+        self.stdout.write(
+            f"{warmed} titles cached, {len(keys) - warmed} failed, "
+            f"{len(titles) - len(keys)} skipped"
+        )
@@ -5,6 +5,23 @@ import uuid
 
 class MovieBaseModel(models.Model):
     PLATFORMS = (("movie", "movie"), ("tv", "tv"))
+    # Columns read by the list endpoints (author loaded in the same query)
+    LIST_FIELDS = (
+        "created_at",
+        "movie_id",
+        "movie_name",
+        "platform",
+        "tags",
+        "user__username",
+    )
+    DETAILS_FIELDS = (
+        "released_date",
+        "poster_path",
+        "backdrop_path",
+        "synopsis",
+        "director",
+        "details_updated_at",
+    )
 
     id = models.UUIDField(primary_key=True, editable=False, default=uuid.uuid4)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -15,13 +32,49 @@ class MovieBaseModel(models.Model):
     movie_name = models.CharField(max_length=100)
     platform = models.CharField(max_length=50, choices=PLATFORMS)
     tags = models.CharField(max_length=999, null=True)
+    # Normalized tags (indexed filter), see reindex_tags command
+    tag_index = models.ManyToManyField("Tag", related_name="%(class)ss", blank=True)
+    # TMDB details, captured at creation (see refresh_movie_details command)
+    released_date = models.CharField(max_length=10, null=True)
+    poster_path = models.CharField(max_length=100, null=True)
+    backdrop_path = models.CharField(max_length=100, null=True)
+    synopsis = models.TextField(null=True)
+    director = models.CharField(max_length=100, null=True)
+    details_updated_at = models.DateTimeField(null=True)
 
     class Meta:
         abstract = True
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "movie_id"], name="%(class)s_unique_user_movie"
+            )
+        ]
+        indexes = [
+            # Feeds (by user or global), newest first
+            models.Index(
+                fields=["user", "-created_at"], name="%(class)s_user_created_idx"
+            ),
+            models.Index(fields=["-created_at"], name="%(class)s_created_idx"),
+            # Per movie lookups (critics & votes of a movie), newest first
+            models.Index(
+                fields=["movie_id", "-created_at"], name="%(class)s_movie_created_idx"
+            ),
+        ]
 
     def user_name(self):
         return self.user.username
 
+    def movie_details(self):
+        details = {
+            "released_date": self.released_date,
+            "poster_path": self.poster_path,
+            "synopsis": self.synopsis,
+            "backdrop_path": self.backdrop_path,
+        }
+        if self.director:
+            details["director"] = self.director
+        return details
+
 
 class Critic(MovieBaseModel):
     content = models.CharField(max_length=2000)
@@ -30,6 +83,13 @@ class Critic(MovieBaseModel):
 class Vote(MovieBaseModel):
     value = models.FloatField()
 
+    class Meta(MovieBaseModel.Meta):
+        indexes = MovieBaseModel.Meta.indexes + [
+            models.Index(
+                fields=["value", "-created_at"], name="vote_value_created_idx"
+            ),
+        ]
+
 
 class Masterpiece(MovieBaseModel):
     pass
@@ -37,3 +97,143 @@ class Masterpiece(MovieBaseModel):
 
 class Watchlist(MovieBaseModel):
     pass
+
+
+class MovieRating(models.Model):
+    """
+    Votes, critics & masterpieces aggregates of a title, kept up to date by the
+    services (see recompute_movie_ratings command)
+    """
+
+    # Vote values (0 to 5 by 0.5), one histogram column each
+    VALUES = tuple(x * 0.5 for x in range(0, 11))
+
+    platform = models.CharField(max_length=50, choices=MovieBaseModel.PLATFORMS)
+    movie_id = models.IntegerField()
+    votes = models.IntegerField(default=0)
+    votes_sum = models.FloatField(default=0)
+    critics = models.IntegerField(default=0)
+    masterpieces = models.IntegerField(default=0)
+    votes_0 = models.IntegerField(default=0)
+    votes_0_5 = models.IntegerField(default=0)
+    votes_1 = models.IntegerField(default=0)
+    votes_1_5 = models.IntegerField(default=0)
+    votes_2 = models.IntegerField(default=0)
+    votes_2_5 = models.IntegerField(default=0)
+    votes_3 = models.IntegerField(default=0)
+    votes_3_5 = models.IntegerField(default=0)
+    votes_4 = models.IntegerField(default=0)
+    votes_4_5 = models.IntegerField(default=0)
+    votes_5 = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["platform", "movie_id"], name="unique_movie_rating"
+            )
+        ]
+
+    @staticmethod
+    def histogram_field(value: float):
+        """
+        Histogram column of a vote value (2.5 : votes_2_5)
+        """
+        return f"votes_{value:g}".replace(".", "_")
+
+    def mean(self):
+        if not self.votes:
+            return None
+        return round(self.votes_sum / self.votes, 2)
+
+    def histogram(self):
+        return {
+            f"{value:.1f}": getattr(self, self.histogram_field(value))
+            for value in self.VALUES
+        }
+
+
+class Tag(models.Model):
+    """
+    Movie genre or music gender, linked to the entries tagged with it
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class TMDBCache(models.Model):
+    platform = models.CharField(max_length=50, choices=MovieBaseModel.PLATFORMS)
+    movie_id = models.IntegerField()
+    language = models.CharField(max_length=10)
+    payload = models.JSONField()
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["platform", "movie_id", "language"],
+                name="unique_tmdb_cache_entry",
+            )
+        ]
+
+
+class UserStats(models.Model):
+    """
+    Movie + music counters of a user, kept up to date by the services
+    (see recompute_user_stats command)
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+    )
+    critics = models.IntegerField(default=0)
+    masterpieces = models.IntegerField(default=0)
+    watchlists = models.IntegerField(default=0)
+    votes = models.IntegerField(default=0)
+
+
+class ExportJob(models.Model):
+    """
+    Export requested by a user, written to EXPORT_ROOT by the export_worker
+    command then downloaded until it expires
+    """
+
+    KINDS = (("movie_critics", "movie_critics"), ("music_critics", "music_critics"))
+    STATUSES = (
+        ("pending", "pending"),
+        ("running", "running"),
+        ("done", "done"),
+        ("failed", "failed"),
+        ("expired", "expired"),
+    )
+    ACTIVE_STATUSES = ("pending", "running")
+
+    id = models.UUIDField(primary_key=True, editable=False, default=uuid.uuid4)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=50, choices=KINDS)
+    status = models.CharField(max_length=10, choices=STATUSES, default="pending")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+    # File name in EXPORT_ROOT (done jobs only)
+    file = models.CharField(max_length=255, null=True)
+    error = models.CharField(max_length=999, null=True)
+
+    class Meta:
+        constraints = [
+            # One pending / running job per user & kind : requests are deduplicated
+            models.UniqueConstraint(
+                fields=["user", "kind"],
+                condition=models.Q(status__in=("pending", "running")),
+                name="unique_active_export_job",
+            )
+        ]
+        indexes = [
+            # Worker queue (oldest pending first) & expiry scans
+            models.Index(fields=["status", "created_at"], name="export_status_idx"),
+        ]
@@ -1,20 +1,15 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Masterpiece, Watchlist, Vote, Critic
-from marcus_music.models import (
-    Masterpiece as MusicMasterpiece,
-    Playlist,
-    Vote as MusicVote,
-    Critic as MusicCritic,
-)
+from .models import ExportJob, Masterpiece, MovieRating, Watchlist, Vote, Critic
 from .services import TMDBService
 
 
 class UserSerializer(serializers.ModelSerializer):
-    user_critics = serializers.SerializerMethodField()
-    user_masterpieces = serializers.SerializerMethodField()
-    user_watchlists = serializers.SerializerMethodField()
-    user_votes = serializers.SerializerMethodField()
+    # Annotated by UserService.with_stats()
+    user_critics = serializers.IntegerField(read_only=True)
+    user_masterpieces = serializers.IntegerField(read_only=True)
+    user_watchlists = serializers.IntegerField(read_only=True)
+    user_votes = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -27,34 +22,41 @@ class UserSerializer(serializers.ModelSerializer):
             "user_votes",
         )
 
-    def get_user_critics(self, obj):
-        movie_critics = Critic.objects.filter(user=obj.pk).count()
-        music_critics = MusicCritic.objects.filter(user=obj.pk).count()
 
-        return movie_critics + music_critics
-
-    def get_user_masterpieces(self, obj):
-        movie_masterpieces = Masterpiece.objects.filter(user=obj.pk).count()
-        music_masterpieces = MusicMasterpiece.objects.filter(user=obj.pk).count()
-
-        return movie_masterpieces + music_masterpieces
-
-    def get_user_watchlists(self, obj):
-        watchlists = Watchlist.objects.filter(user=obj.pk).count()
-        playlists = Playlist.objects.filter(user=obj.pk).count()
-
-        return watchlists + playlists
-
-    def get_user_votes(self, obj):
-        movie_votes = Vote.objects.filter(user=obj.pk).count()
-        music_votes = MusicVote.objects.filter(user=obj.pk).count()
+class MovieDetailsSerializer(serializers.ModelSerializer):
+    movie_details = serializers.SerializerMethodField()
 
-        return movie_votes + music_votes
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # ?details=none : the client hydrates details later (api/movies/details)
+        if self.context.get("details") == "none":
+            self.fields.pop("movie_details")
 
+    def get_movie_details(self, obj):
+        if obj.details_updated_at is not None:
+            return obj.movie_details()
+        key = (obj.platform, obj.movie_id)
+        if "movie_details" in self.context:
+            response = self.context["movie_details"].get(key)
+        else:
+            try:
+                if obj.platform == "movie":
+                    response = TMDBService.movie_details(obj.movie_id)
+                else:
+                    response = TMDBService.tv_details(obj.movie_id)
+            except Exception as e:
+                print("While getting movie details :", e)
+                response = None
+        # TMDB slow or unavailable : partial (or expired) details
+        if response is None:
+            return {"degraded": True}
+        details = TMDBService.project(platform=obj.platform, response=response)
+        if key in self.context.get("degraded_movie_details", ()):
+            details["degraded"] = True
+        return details
 
-class MasterpieceSerializer(serializers.ModelSerializer):
-    movie_details = serializers.SerializerMethodField()
 
+class MasterpieceSerializer(MovieDetailsSerializer):
     class Meta:
         model = Masterpiece
         fields = (
@@ -67,23 +69,6 @@ class MasterpieceSerializer(serializers.ModelSerializer):
             "tags",
         )
 
-    def get_movie_details(self, obj):
-        details = {}
-        if obj.platform == "movie":
-            response = TMDBService.movie_details(obj.movie_id)
-            details["released_date"] = response["release_date"]
-        else:
-            response = TMDBService.tv_details(obj.movie_id)
-            details["released_date"] = response["first_air_date"]
-        details["poster_path"] = response["poster_path"]
-        details["synopsis"] = response["overview"]
-        try:
-            details["backdrop_path"] = response["backdrop_path"]
-            details["director"] = response.get("created_by")[0].get("name")
-        except Exception as e:
-            print("While getting director :", e)
-        return details
-
 
 class CreateMasterpieceSerializer(serializers.ModelSerializer):
     class Meta:
@@ -96,9 +81,7 @@ class CreateMasterpieceSerializer(serializers.ModelSerializer):
         )
 
 
-class WatchlistSerializer(serializers.ModelSerializer):
-    movie_details = serializers.SerializerMethodField()
-
+class WatchlistSerializer(MovieDetailsSerializer):
     class Meta:
         model = Watchlist
         fields = (
@@ -112,24 +95,6 @@ class WatchlistSerializer(serializers.ModelSerializer):
             "tags",
         )
 
-    def get_movie_details(self, obj):
-        details = {}
-        if obj.platform == "movie":
-            response = TMDBService.movie_details(obj.movie_id)
-            details["released_date"] = response["release_date"]
-        else:
-            response = TMDBService.tv_details(obj.movie_id)
-            details["released_date"] = response["first_air_date"]
-        details["poster_path"] = response["poster_path"]
-        details["synopsis"] = response["overview"]
-        try:
-            details["backdrop_path"] = response["backdrop_path"]
-            details["director"] = response.get("created_by")[0].get("name")
-        except Exception as e:
-            print("While getting director :", e)
-
-        return details
-
 
 class CreateWatchlistSerializer(serializers.ModelSerializer):
     class Meta:
@@ -170,7 +135,7 @@ class CreateVoteSerializer(serializers.ModelSerializer):
 
 class CriticVoteSerializer(serializers.Serializer):
     user_id = serializers.IntegerField()
-    user_name = serializers.CharField()
+    user_name = serializers.CharField(source="username")
     vote = serializers.FloatField()
     content = serializers.CharField()
 
@@ -193,3 +158,21 @@ class CreateCriticSerializer(serializers.ModelSerializer):
     class Meta:
         model = Critic
         fields = ("movie_id", "movie_name", "content", "platform", "tags")
+
+
+class MovieRatingSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MovieRating
+        fields = ("votes", "mean", "histogram", "critics", "masterpieces")
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExportJob
+        fields = ("id", "kind", "status", "created_at", "finished_at", "error")
+
+
+class CreateExportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExportJob
+        fields = ("kind",)
@@ -1,15 +1,54 @@
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core import exceptions
 from django.core.paginator import Paginator
-from django.db import models
+from django.db import IntegrityError, connection, connections, models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Coalesce
+from django.db.models.sql import InsertQuery
+from django.utils import timezone
+from django.utils.html import escape
+from django.utils.module_loading import import_string
 
 from django.contrib.auth.models import User
-from marcus.models import Critic, Masterpiece, Watchlist, Vote
+from marcus.models import (
+    Critic,
+    ExportJob,
+    Masterpiece,
+    MovieRating,
+    Tag,
+    TMDBCache,
+    UserStats,
+    Vote,
+    Watchlist,
+)
+from marcus_music.models import (
+    Masterpiece as MusicMasterpiece,
+    Playlist,
+    Vote as MusicVote,
+    Critic as MusicCritic,
+)
 
-import io
+import base64
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+import requests
 import xlsxwriter
-
-# from django.db.models import Q
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from django.conf import settings
 import tmdbsimple as tmdb
@@ -22,19 +61,37 @@ class ToolkitService:
     Toolkit service class
     """
 
-    def paginate(*, page_number: int, range: int, objects: list[object]):
+    def paginate(
+        *, page_number: int, range: int, objects: list[object], total: str = "exact"
+    ):
         """
-        Returns paginated objects
+        Returns paginated objects, total being counted ("exact"),
+        cached until a write on the model ("cached") or skipped ("none" : None)
         """
         if range is None:
-            paginated_objects = objects
-            page = paginated_objects
+            # Everything is fetched anyway : no count needed
+            page = list(objects)
             has_next = False
-            total_objects = objects.count()
+            total_objects = len(page)
             start_index = 1
             end_index = total_objects
+        elif total == "none":
+            try:
+                number = max(int(page_number), 1)
+            except (TypeError, ValueError):
+                number = 1
+            start = (number - 1) * range
+            # One more row tells if there is a next page
+            page = list(objects[start : start + range + 1])
+            has_next = len(page) > range
+            page = page[:range]
+            total_objects = None
+            start_index = start + 1 if page else 0
+            end_index = start + len(page) if page else 0
         else:
             paginated_objects = Paginator(objects, range)
+            if total == "cached":
+                paginated_objects.count = ToolkitService.count(objects=objects)
             page = paginated_objects.get_page(page_number)
             has_next = page.has_next()
             start_index = page.start_index()
@@ -43,6 +100,383 @@ class ToolkitService:
 
         return page, has_next, start_index, end_index, total_objects
 
+    def count(*, objects: models.QuerySet):
+        """
+        objects.count(), cached per query until a write on the model
+        """
+        label = objects.model._meta.label_lower
+        version = cache.get_or_set(f"counts:{label}", time.time_ns, None)
+        sql, params = objects.query.sql_with_params()
+        key = hashlib.md5(repr((sql, params)).encode()).hexdigest()
+        return cache.get_or_set(
+            f"counts:{label}:{version}:{key}",
+            objects.count,
+            getattr(settings, "COUNT_CACHE_TTL", 300),
+        )
+
+    def forget_counts(*, model: type[models.Model]):
+        """
+        Drop cached counts of model, now and once the current transaction is
+        committed (a count cached in between would miss the write)
+        """
+        key = f"counts:{model._meta.label_lower}"
+        cache.set(key, time.time_ns(), None)
+        transaction.on_commit(lambda: cache.set(key, time.time_ns(), None))
+
+    def shared_cache():
+        """
+        True if the default cache is shared by every process (see CACHES)
+        """
+        return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+    def page(*, params, range: int, objects: models.QuerySet):
+        """
+        Returns a page of objects & the pagination fields of the response :
+        keyset page if ?cursor= (no count), else numbered page (?page=)
+        with a total (null with ?total=none), cached if the cache is shared :
+        a process-local cache would serve totals other processes changed
+        """
+        if "cursor" not in params:
+            total = "cached" if ToolkitService.shared_cache() else "exact"
+            if params.get("total") == "none":
+                total = "none"
+            page, has_next, start_index, end_index, total_objects = (
+                ToolkitService.paginate(
+                    page_number=params.get("page"),
+                    range=range,
+                    objects=objects,
+                    total=total,
+                )
+            )
+            return page, {
+                "total": total_objects,
+                "from": start_index,
+                "to": end_index,
+                "is_last_page": not has_next,
+            }
+        # Cursor mode is always paged
+        if range is None:
+            range = ToolkitService.page_size(value=params.get("page_size"), default=20)
+        try:
+            page, next_cursor = ToolkitService.paginate_cursor(
+                cursor=params["cursor"], range=range, objects=objects
+            )
+        except ValueError:
+            raise ValidationError({"error": "Invalid cursor."})
+        return page, {"next_cursor": next_cursor, "is_last_page": next_cursor is None}
+
+    def paginate_cursor(*, cursor: str, range: int, objects: models.QuerySet):
+        """
+        Returns the objects after cursor ("" : first page), newest first,
+        & the cursor of the next page (None on the last page)
+        """
+        objects = objects.order_by("-created_at", "-pk")
+        if cursor:
+            # Malformed base64 / date raise ValueError, malformed pk ValidationError
+            try:
+                created_at, pk = (
+                    base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+                )
+                created_at = datetime.fromisoformat(created_at)
+                pk = objects.model._meta.pk.to_python(pk)
+            except exceptions.ValidationError as e:
+                raise ValueError(e)
+            # Index seek on created_at, ties broken by pk
+            objects = objects.filter(created_at__lte=created_at).exclude(
+                created_at=created_at, pk__gte=pk
+            )
+        page = list(objects[: range + 1])
+        if len(page) <= range:
+            return page, None
+        last = page[range - 1]
+        next_cursor = f"{last.created_at.isoformat()}|{last.pk}"
+        return page[:range], base64.urlsafe_b64encode(next_cursor.encode()).decode()
+
+    def insert_ignore(*, obj: models.Model):
+        """
+        Single INSERT ... ON CONFLICT DO NOTHING, True if the row was inserted.
+        Multi-table inheritance : the parent row (holding the unique key) decides,
+        then the child row is inserted
+        """
+        model = type(obj)
+        parents = model._meta.get_parent_list()
+        for parent, field in model._meta.parents.items():
+            setattr(obj, field.attname, getattr(obj, parent._meta.pk.attname))
+        with connection.cursor() as cursor:
+            for index, table in enumerate([*reversed(parents), model]):
+                query = InsertQuery(
+                    table, on_conflict=None if index else OnConflict.IGNORE
+                )
+                query.insert_values(table._meta.local_concrete_fields, [obj])
+                for sql, params in query.get_compiler(connection=connection).as_sql():
+                    cursor.execute(sql, params)
+                if not index and cursor.rowcount != 1:
+                    return False
+        return True
+
+    def page_size(*, value: str, default: int, maximum: int = 100):
+        """
+        Page size requested by the client (bounded), else the service default
+        """
+        try:
+            return min(max(int(value), 1), maximum)
+        except (TypeError, ValueError):
+            return default
+
+
+class UserService:
+    """
+    User service class
+    """
+
+    @staticmethod
+    def list(*, search: str, page: int):
+        """
+        Users with their stats (optional : by username, paginated if page)
+        """
+        range = 20 if page else None
+        users = UserService.with_stats().order_by("id")
+
+        if search:
+            users = users.filter(username__icontains=search)
+
+        return users, range
+
+    @staticmethod
+    def with_stats():
+        """
+        Users annotated with their stats, in a single query
+        (counted from the tables for users without UserStats yet)
+        """
+        return User.objects.annotate(
+            **{
+                f"user_{field}": Coalesce(F(f"stats__{field}"), count)
+                for field, count in UserStatsService.counts().items()
+            }
+        )
+
+
+class UserStatsService:
+    """
+    UserStats service class
+    """
+
+    @staticmethod
+    def counts():
+        """
+        Movie + music counts of the outer user, as subqueries
+        """
+
+        def count(model):
+            rows = (
+                model.objects.filter(user=OuterRef("pk"))
+                .order_by()
+                .values("user")
+                .annotate(count=Count("pk"))
+                .values("count")
+            )
+            return Coalesce(Subquery(rows), 0)
+
+        return {
+            "critics": count(Critic) + count(MusicCritic),
+            "masterpieces": count(Masterpiece) + count(MusicMasterpiece),
+            "watchlists": count(Watchlist) + count(Playlist),
+            "votes": count(Vote) + count(MusicVote),
+        }
+
+    @staticmethod
+    def increment(*, user: User, **counts: int):
+        """
+        Add counts to user stats, within the caller's transaction
+        """
+        updated = UserStats.objects.filter(user=user).update(
+            **{field: F(field) + amount for field, amount in counts.items()}
+        )
+        # No stats yet : count everything (this change included)
+        if not updated:
+            UserStatsService.recompute(users=User.objects.filter(pk=user.pk))
+
+    @staticmethod
+    def recompute(*, users, batch_size: int = 500):
+        """
+        Recount stats of users from the tables, returns the number of users
+        """
+        fields = list(UserStatsService.counts())
+        rows = users.order_by("pk").annotate(**UserStatsService.counts())
+        total = 0
+        batch = []
+        for user in rows.values("pk", *fields).iterator(chunk_size=batch_size):
+            batch.append(
+                UserStats(
+                    user_id=user["pk"], **{field: user[field] for field in fields}
+                )
+            )
+            if len(batch) == batch_size:
+                total += UserStatsService.save(stats=batch, fields=fields)
+                batch = []
+        return total + UserStatsService.save(stats=batch, fields=fields)
+
+    @staticmethod
+    def save(*, stats: list[UserStats], fields: list[str]):
+        UserStats.objects.bulk_create(
+            stats, update_conflicts=True, unique_fields=["user"], update_fields=fields
+        )
+        return len(stats)
+
+
+class TagService:
+    """
+    Tag service class
+    """
+
+    @staticmethod
+    def split(*, tags: str):
+        """
+        Tag names of a comma separated string
+        """
+        return {name.strip() for name in (tags or "").split(",") if name.strip()}
+
+    @staticmethod
+    def link(*, objects: list[models.Model], source: str, replace: bool = False):
+        """
+        Link objects to the tags of their source field (comma separated),
+        replace : also unlink the tags they no longer have
+        """
+        if not objects:
+            return
+        field = type(objects[0])._meta.get_field("tag_index")
+        through = field.remote_field.through
+        entry_id = f"{field.m2m_field_name()}_id"
+        tag_id = f"{field.m2m_reverse_field_name()}_id"
+
+        names = {obj.pk: TagService.split(tags=getattr(obj, source)) for obj in objects}
+        all_names = set().union(*names.values())
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in all_names], ignore_conflicts=True
+        )
+        ids = dict(Tag.objects.filter(name__in=all_names).values_list("name", "id"))
+
+        if replace:
+            through.objects.filter(**{f"{entry_id}__in": names}).delete()
+        through.objects.bulk_create(
+            [
+                through(**{entry_id: pk, tag_id: ids[name]})
+                for pk, entry_names in names.items()
+                for name in entry_names
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class RatingService:
+    """
+    MovieRating service class
+    """
+
+    @staticmethod
+    def get_many(*, keys: list[tuple[str, int]]):
+        """
+        Ratings of (platform, movie_id) keys, zeros for titles without any
+        """
+        titles = Q()
+        for platform, movie_id in keys:
+            titles |= Q(platform=platform, movie_id=movie_id)
+        ratings = {
+            (rating.platform, rating.movie_id): rating
+            for rating in MovieRating.objects.filter(titles)
+        }
+        return {
+            key: ratings.get(key) or MovieRating(platform=key[0], movie_id=key[1])
+            for key in keys
+        }
+
+    @staticmethod
+    def increment(*, platform: str, movie_id: int, **counts: float):
+        """
+        Add counts to the rating of a title, within the caller's transaction
+        """
+        updated = MovieRating.objects.filter(
+            platform=platform, movie_id=movie_id
+        ).update(**{field: F(field) + amount for field, amount in counts.items()})
+        # No rating yet : aggregate everything (this change included)
+        if not updated:
+            RatingService.recompute(keys=[(platform, movie_id)])
+
+    @staticmethod
+    def vote_counts(*, value: float, sign: int = 1):
+        """
+        Rating counts of adding (sign 1) or removing (sign -1) a vote
+        """
+        value = float(value)
+        return {
+            "votes": sign,
+            "votes_sum": sign * value,
+            MovieRating.histogram_field(value): sign,
+        }
+
+    @staticmethod
+    def recompute(*, keys: list[tuple[str, int]] = None, batch_size: int = 500):
+        """
+        Aggregate ratings of titles (every title if no keys) from the tables,
+        returns the number of titles
+        """
+        if keys is not None:
+            if not keys:
+                return 0
+            keys = [(platform, int(movie_id)) for platform, movie_id in keys]
+        titles = Q()
+        for platform, movie_id in keys or ():
+            titles |= Q(platform=platform, movie_id=movie_id)
+
+        def rows(model, **aggregates):
+            return (
+                model.objects.filter(titles)
+                .order_by()
+                .values("platform", "movie_id")
+                .annotate(**aggregates)
+                .iterator(chunk_size=batch_size)
+            )
+
+        # Given titles without rows anymore are reset
+        ratings = {key: {} for key in keys or ()}
+        histogram = {
+            MovieRating.histogram_field(value): Count("pk", filter=Q(value=value))
+            for value in MovieRating.VALUES
+        }
+        for model, aggregates in (
+            (Vote, {"votes": Count("pk"), "votes_sum": Sum("value"), **histogram}),
+            (Critic, {"critics": Count("pk")}),
+            (Masterpiece, {"masterpieces": Count("pk")}),
+        ):
+            for row in rows(model, **aggregates):
+                key = (row.pop("platform"), row.pop("movie_id"))
+                ratings.setdefault(key, {}).update(row)
+
+        fields = [
+            "votes",
+            "votes_sum",
+            "critics",
+            "masterpieces",
+            *histogram,
+        ]
+        with transaction.atomic():
+            if keys is None:
+                MovieRating.objects.update(**{field: 0 for field in fields})
+            MovieRating.objects.bulk_create(
+                [
+                    MovieRating(platform=platform, movie_id=movie_id, **counts)
+                    for (platform, movie_id), counts in ratings.items()
+                ],
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=["platform", "movie_id"],
+                update_fields=fields,
+            )
+            if keys is None:
+                # Titles without rows anymore
+                MovieRating.objects.filter(votes=0, critics=0, masterpieces=0).delete()
+        return len(ratings)
+
 
 class MasterpieceService:
     """
@@ -55,13 +489,17 @@ class MasterpieceService:
         Paginated list (optional : by user)
         """
         range = 10
-        masterpieces = Masterpiece.objects.all().order_by("-created_at")
+        masterpieces = (
+            Masterpiece.objects.select_related("user")
+            .only(*Masterpiece.LIST_FIELDS, *Masterpiece.DETAILS_FIELDS)
+            .order_by("-created_at")
+        )
 
         if user:
             masterpieces = masterpieces.filter(user=user)
 
         if tag not in ("Tous", None):
-            masterpieces = masterpieces.filter(tags__contains=tag)
+            masterpieces = masterpieces.filter(tag_index__name=tag)
 
         return masterpieces, range
 
@@ -70,15 +508,27 @@ class MasterpieceService:
         """
         Create if (user & movie_id) does not exist
         """
-        vote, created = Masterpiece.objects.get_or_create(
+        vote = Masterpiece(
             user=user,
             movie_id=movie_id,
-            defaults={
-                "movie_name": movie_name,
-                "platform": platform,
-                "tags": tags,
-            },
+            movie_name=movie_name,
+            platform=platform,
+            tags=tags,
         )
+        # TMDB (cached) is called before the transaction : no database lock held
+        # meanwhile. Duplicates are settled by the insert, no existence check
+        details = TMDBService.denormalized_fields(platform=platform, movie_id=movie_id)
+        for field, detail in details.items():
+            setattr(vote, field, detail)
+        with transaction.atomic():
+            created = ToolkitService.insert_ignore(obj=vote)
+            if created:
+                UserStatsService.increment(user=user, masterpieces=1)
+                RatingService.increment(
+                    platform=platform, movie_id=movie_id, masterpieces=1
+                )
+                TagService.link(objects=[vote], source="tags")
+                ToolkitService.forget_counts(model=Masterpiece)
         if not created:
             return {
                 "error": f"Movie {vote.movie_id} {vote.movie_name} already exists in Masterpiece."
@@ -93,8 +543,16 @@ class MasterpieceService:
         Delete a row by movie_id (called by user)
         """
         try:
-            masterpiece = Masterpiece.objects.get(user=user, movie_id=movie_id)
-            masterpiece.delete()
+            with transaction.atomic():
+                masterpiece = Masterpiece.objects.get(user=user, movie_id=movie_id)
+                masterpiece.delete()
+                UserStatsService.increment(user=user, masterpieces=-1)
+                RatingService.increment(
+                    platform=masterpiece.platform,
+                    movie_id=masterpiece.movie_id,
+                    masterpieces=-1,
+                )
+                ToolkitService.forget_counts(model=Masterpiece)
             return 204
         except Exception as e:
             print(e)
@@ -112,13 +570,17 @@ class WatchlistService:
         Paginated list (optional : by user)
         """
         range = 10
-        watchlists = Watchlist.objects.all().order_by("-created_at")
+        watchlists = (
+            Watchlist.objects.select_related("user")
+            .only(*Watchlist.LIST_FIELDS, *Watchlist.DETAILS_FIELDS)
+            .order_by("-created_at")
+        )
 
         if user:
             watchlists = watchlists.filter(user=user)
 
         if tag not in ("Tous", None):
-            watchlists = watchlists.filter(tags__contains=tag)
+            watchlists = watchlists.filter(tag_index__name=tag)
 
         return watchlists, range
 
@@ -127,15 +589,24 @@ class WatchlistService:
         """
         Create if (user & movie_id) does not exist
         """
-        vote, created = Watchlist.objects.get_or_create(
+        vote = Watchlist(
             user=user,
             movie_id=movie_id,
-            defaults={
-                "movie_name": movie_name,
-                "platform": platform,
-                "tags": tags,
-            },
+            movie_name=movie_name,
+            platform=platform,
+            tags=tags,
         )
+        # TMDB (cached) is called before the transaction : no database lock held
+        # meanwhile. Duplicates are settled by the insert, no existence check
+        details = TMDBService.denormalized_fields(platform=platform, movie_id=movie_id)
+        for field, detail in details.items():
+            setattr(vote, field, detail)
+        with transaction.atomic():
+            created = ToolkitService.insert_ignore(obj=vote)
+            if created:
+                UserStatsService.increment(user=user, watchlists=1)
+                TagService.link(objects=[vote], source="tags")
+                ToolkitService.forget_counts(model=Watchlist)
         if not created:
             return {
                 "error": f"Movie {vote.movie_id} {vote.movie_name} already exists in Watchlist."
@@ -150,8 +621,11 @@ class WatchlistService:
         Delete a row by movie_id (called by user)
         """
         try:
-            watchlist = Watchlist.objects.get(user=user, movie_id=movie_id)
-            watchlist.delete()
+            with transaction.atomic():
+                watchlist = Watchlist.objects.get(user=user, movie_id=movie_id)
+                watchlist.delete()
+                UserStatsService.increment(user=user, watchlists=-1)
+                ToolkitService.forget_counts(model=Watchlist)
             return 204
         except Exception as e:
             print(e)
@@ -169,7 +643,11 @@ class VoteService:
         Paginated list (optional filters : by user, by stars)
         """
         range = 20
-        votes = Vote.objects.all().order_by("-created_at")
+        votes = (
+            Vote.objects.select_related("user")
+            .only(*Vote.LIST_FIELDS, "value")
+            .order_by("-created_at")
+        )
 
         if user:
             votes = votes.filter(user=user)
@@ -181,7 +659,7 @@ class VoteService:
             votes = votes.filter(movie_id=movie_id)
 
         if tag not in ("Tous", None):
-            votes = votes.filter(tags__contains=tag)
+            votes = votes.filter(tag_index__name=tag)
 
         return votes, range
 
@@ -198,16 +676,30 @@ class VoteService:
         """
         Create if (user & movie_id) does not exist
         """
-        vote, created = Vote.objects.get_or_create(
+        vote = Vote(
             user=user,
             movie_id=movie_id,
-            defaults={
-                "movie_name": movie_name,
-                "platform": platform,
-                "value": value,
-                "tags": tags,
-            },
+            movie_name=movie_name,
+            platform=platform,
+            value=value,
+            tags=tags,
         )
+        # TMDB (cached) is called before the transaction : no database lock held
+        # meanwhile. Duplicates are settled by the insert, no existence check
+        details = TMDBService.denormalized_fields(platform=platform, movie_id=movie_id)
+        for field, detail in details.items():
+            setattr(vote, field, detail)
+        with transaction.atomic():
+            created = ToolkitService.insert_ignore(obj=vote)
+            if created:
+                UserStatsService.increment(user=user, votes=1)
+                RatingService.increment(
+                    platform=platform,
+                    movie_id=movie_id,
+                    **RatingService.vote_counts(value=value),
+                )
+                TagService.link(objects=[vote], source="tags")
+                ToolkitService.forget_counts(model=Vote)
         if not created:
             return {
                 "error": f"Movie {vote.movie_id} {vote.movie_name} already exists in Vote."
@@ -232,8 +724,16 @@ class VoteService:
         Delete a row by movie_id (called by user)
         """
         try:
-            vote = Vote.objects.get(user=user, movie_id=movie_id)
-            vote.delete()
+            with transaction.atomic():
+                vote = Vote.objects.get(user=user, movie_id=movie_id)
+                vote.delete()
+                UserStatsService.increment(user=user, votes=-1)
+                RatingService.increment(
+                    platform=vote.platform,
+                    movie_id=vote.movie_id,
+                    **RatingService.vote_counts(value=vote.value, sign=-1),
+                )
+                ToolkitService.forget_counts(model=Vote)
             return 204
         except Exception as e:
             print(e)
@@ -246,18 +746,35 @@ class CriticService:
     """
 
     @staticmethod
-    def export(*, user: int):
-        critics = Critic.objects.all().order_by("-created_at")
+    def export(*, user: int, chunk_size: int = 2000):
+        """
+        Critics of user as an xlsx file (temporary file, rewound), written row
+        by row : memory stays flat whatever the number of critics
+        """
+        critics = (
+            Critic.objects.filter(user=user)
+            .only(
+                "id",
+                "movie_id",
+                "movie_name",
+                "platform",
+                "tags",
+                "content",
+                "created_at",
+            )
+            .order_by("-created_at")
+        )
 
-        buffer = io.BytesIO()
-        workbook = xlsxwriter.Workbook(buffer)
+        document = tempfile.TemporaryFile()
+        workbook = xlsxwriter.Workbook(document, {"constant_memory": True})
         worksheet = workbook.add_worksheet()
 
         headers = ["ID", "TMDB ID", "Nom", "Type", "Genres", "Critique", "Date d'ajout"]
         for col_num, header in enumerate(headers):
             worksheet.write(0, col_num, header)
 
-        for row_num, critic in enumerate(critics.filter(user=user), start=1):
+        rows = critics.iterator(chunk_size=chunk_size)
+        for row_num, critic in enumerate(rows, start=1):
             worksheet.write(row_num, 0, str(critic.id))
             worksheet.write(row_num, 1, critic.movie_id)
             worksheet.write(row_num, 2, critic.movie_name)
@@ -267,9 +784,9 @@ class CriticService:
             worksheet.write(row_num, 6, critic.created_at.strftime("%d-%m-%Y"))
 
         workbook.close()
-        buffer.seek(0)
+        document.seek(0)
 
-        return buffer
+        return document
 
     @staticmethod
     def list(*, user: int, tag: str):
@@ -277,39 +794,37 @@ class CriticService:
         Paginated list of critics (optional : by user, by gender_tag)
         """
         range = 10
-        critics = Critic.objects.all().order_by("-created_at")
+        critics = (
+            Critic.objects.select_related("user")
+            .only(*Critic.LIST_FIELDS, "content")
+            .order_by("-created_at")
+        )
 
         if user:
             critics = critics.filter(user=user)
 
         if tag not in ("Tous", None):
-            critics = critics.filter(tags__contains=tag)
+            critics = critics.filter(tag_index__name=tag)
 
         return critics, range
 
     @staticmethod
     def list_by_movie_id_and_aggregate_votes(*, movie: int):
         """
-        List Critics by movie_id with associated vote
+        Paginated list of critics of a movie, with their author's vote & username
         """
-
-        critics = Critic.objects.filter(movie_id=movie).order_by("-created_at")
-        votes = Vote.objects.filter(movie_id=movie)
-        merged_query = []
-        for critic in critics:
-            data = {}
-            data["user_id"] = critic.user_id
-            data["user_name"] = critic.user_name
-            data["content"] = critic.content
-            data["vote"] = None
-            if len(votes) > 0:
-                for vote in votes:
-                    if (critic.movie_id == vote.movie_id) and (
-                        critic.user_id == vote.user_id
-                    ):
-                        data["vote"] = vote.value
-            merged_query.append(data)
-        return merged_query
+        range = 10
+        # (user, movie_id) is unique : one vote at most
+        votes = Vote.objects.filter(
+            user=OuterRef("user"), movie_id=OuterRef("movie_id")
+        ).values("value")[:1]
+        critics = (
+            Critic.objects.filter(movie_id=movie)
+            .only("pk", "user_id", "movie_id", "content", "created_at")
+            .annotate(username=F("user__username"), vote=Subquery(votes))
+            .order_by("-created_at")
+        )
+        return critics, range
 
     @staticmethod
     def create(
@@ -324,16 +839,27 @@ class CriticService:
         """
         Create if (user & movie_id) does not exist
         """
-        critic, created = Critic.objects.get_or_create(
+        critic = Critic(
             user=user,
             movie_id=movie_id,
-            defaults={
-                "movie_name": movie_name,
-                "content": content,
-                "platform": platform,
-                "tags": tags,
-            },
+            movie_name=movie_name,
+            content=content,
+            platform=platform,
+            tags=tags,
         )
+        # TMDB (cached) is called before the transaction : no database lock held
+        # meanwhile. Duplicates are settled by the insert, no existence check
+        details = TMDBService.denormalized_fields(platform=platform, movie_id=movie_id)
+        for field, detail in details.items():
+            setattr(critic, field, detail)
+        with transaction.atomic():
+            created = ToolkitService.insert_ignore(obj=critic)
+            if created:
+                UserStatsService.increment(user=user, critics=1)
+                RatingService.increment(platform=platform, movie_id=movie_id, critics=1)
+                TagService.link(objects=[critic], source="tags")
+                ToolkitService.forget_counts(model=Critic)
+                SearchService.index(kind="movie", critics=[critic])
         if not created:
             return {
                 "error": f"Movie {critic.movie_id} {critic.movie_name} already exists in Critic."
@@ -348,25 +874,951 @@ class CriticService:
         Delete a row by movie_id (called by user)
         """
         try:
-            critic = Critic.objects.get(user=user, movie_id=movie_id)
-            critic.delete()
+            with transaction.atomic():
+                critic = Critic.objects.get(user=user, movie_id=movie_id)
+                # Before delete(), which clears the pk
+                SearchService.unindex(critics=[critic])
+                critic.delete()
+                UserStatsService.increment(user=user, critics=-1)
+                RatingService.increment(
+                    platform=critic.platform, movie_id=critic.movie_id, critics=-1
+                )
+                ToolkitService.forget_counts(model=Critic)
             return 204
         except Exception as e:
             print(e)
             return 404
 
 
+class SearchService:
+    """
+    Full-text search service class (SQLite FTS5 index of movie & music critics)
+    """
+
+    # Private use characters : snippet match markers
+    START = "\ue000"
+    END = "\ue001"
+
+    @staticmethod
+    def create_table(*, using: str = "default", **kwargs):
+        """
+        Create the FTS5 index if missing (post_migrate, SQLite only)
+        """
+        if connections[using].vendor != "sqlite":
+            return
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS critic_search USING fts5("
+                "kind UNINDEXED, critic_id UNINDEXED, title, artist, content, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+
+    @staticmethod
+    def rowid(*, critic: models.Model):
+        """
+        FTS5 rowid of a critic (63 bits of its uuid) : deletes by rowid seek
+        """
+        return critic.pk.int & (2**63 - 1)
+
+    @staticmethod
+    def index(*, kind: str, critics: list[models.Model]):
+        """
+        Add critics ("movie" or "music") to the index
+        """
+        if connection.vendor != "sqlite" or not critics:
+            return
+        rows = []
+        for critic in critics:
+            if kind == "movie":
+                title, artist = critic.movie_name, ""
+            else:
+                title, artist = critic.album_name, critic.artist_name
+            rows.append(
+                (
+                    SearchService.rowid(critic=critic),
+                    kind,
+                    str(critic.pk),
+                    title,
+                    artist,
+                    critic.content,
+                )
+            )
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO critic_search "
+                "(rowid, kind, critic_id, title, artist, content) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                rows,
+            )
+
+    @staticmethod
+    def unindex(*, critics: list[models.Model]):
+        """
+        Remove critics from the index
+        """
+        if connection.vendor != "sqlite" or not critics:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                "DELETE FROM critic_search WHERE rowid = %s",
+                [(SearchService.rowid(critic=critic),) for critic in critics],
+            )
+
+    @staticmethod
+    def search(*, query: str, kind: str, page_number: int, range: int = 20):
+        """
+        Critics matching every word of query (last one as a prefix), best first.
+        Returns (kind, critic, snippet) rows of the page, if there is a next page,
+        start & end indexes. Snippets are HTML : escaped content, matches in <b>
+        """
+        words = query.split()
+        if not words:
+            raise ValueError("Empty search.")
+        # Quoted words : no FTS5 syntax from the client
+        match = " ".join('"' + word.replace('"', '""') + '"' for word in words) + "*"
+        try:
+            number = max(int(page_number), 1)
+        except (TypeError, ValueError):
+            number = 1
+
+        sql = (
+            "SELECT kind, critic_id, "
+            "snippet(critic_search, 4, %s, %s, '…', 16) "
+            "FROM critic_search WHERE critic_search MATCH %s"
+        )
+        # Markers outside of HTML, swapped for tags once the content is escaped
+        params = [SearchService.START, SearchService.END, match]
+        if kind:
+            sql += " AND kind = %s"
+            params.append(kind)
+        # Titles weigh more than artists, artists more than critics content
+        sql += " ORDER BY bm25(critic_search, 0, 0, 10.0, 5.0, 1.0) LIMIT %s OFFSET %s"
+        params += [range + 1, (number - 1) * range]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        has_next = len(rows) > range
+        rows = rows[:range]
+        start_index = (number - 1) * range + 1 if rows else 0
+        end_index = (number - 1) * range + len(rows) if rows else 0
+
+        critics = {
+            "movie": Critic.objects.select_related("user").in_bulk(
+                [critic_id for row_kind, critic_id, _ in rows if row_kind == "movie"]
+            ),
+            "music": MusicCritic.objects.select_related("user").in_bulk(
+                [critic_id for row_kind, critic_id, _ in rows if row_kind == "music"]
+            ),
+        }
+        results = []
+        for row_kind, critic_id, snippet in rows:
+            critic = critics[row_kind].get(uuid.UUID(critic_id))
+            # Deleted without the services (e.g. with its user)
+            if critic is not None:
+                snippet = (
+                    escape(snippet)
+                    .replace(SearchService.START, "<b>")
+                    .replace(SearchService.END, "</b>")
+                )
+                results.append((row_kind, critic, snippet))
+        return results, has_next, start_index, end_index
+
+
+class ExportService:
+    """
+    ExportJob service class (jobs run by the export_worker command)
+    """
+
+    # Kind : (service class with an export(user=) method, download file name),
+    # imported by path (marcus_music services import this module)
+    EXPORTERS = {
+        "movie_critics": ("marcus.services.CriticService", "mes_critiques_cinema.xlsx"),
+        "music_critics": (
+            "marcus_music.services.CriticService",
+            "mes_critiques_musique.xlsx",
+        ),
+    }
+
+    @staticmethod
+    def root():
+        return Path(getattr(settings, "EXPORT_ROOT", settings.BASE_DIR / "exports"))
+
+    @staticmethod
+    def create(*, user: User, kind: str):
+        """
+        Queue an export, or return the pending / running one of (user & kind).
+        Returns (job, created)
+        """
+        active = ExportJob.objects.filter(
+            user=user, kind=kind, status__in=ExportJob.ACTIVE_STATUSES
+        )
+        job = active.first()
+        if job is not None:
+            return job, False
+        try:
+            with transaction.atomic():
+                return ExportJob.objects.create(user=user, kind=kind), True
+        except IntegrityError:
+            # Queued by a concurrent request
+            return active.get(), False
+
+    @staticmethod
+    def get(*, user: User, id: uuid.UUID):
+        """
+        Job of user (None if missing)
+        """
+        return ExportJob.objects.filter(user=user, pk=id).first()
+
+    @staticmethod
+    def claim():
+        """
+        Oldest pending job, marked running (None if the queue is empty).
+        Conditional update : concurrent workers never run the same job
+        """
+        while True:
+            job = (
+                ExportJob.objects.filter(status="pending")
+                .order_by("created_at")
+                .first()
+            )
+            if job is None:
+                return None
+            claimed = ExportJob.objects.filter(pk=job.pk, status="pending").update(
+                status="running", started_at=timezone.now()
+            )
+            if claimed:
+                job.status = "running"
+                return job
+
+    @staticmethod
+    def run(*, job: ExportJob):
+        """
+        Write the file of a running job to EXPORT_ROOT, then mark it done (or failed)
+        """
+        root = ExportService.root()
+        root.mkdir(parents=True, exist_ok=True)
+        file = f"{job.pk}.xlsx"
+        try:
+            exporter = import_string(ExportService.EXPORTERS[job.kind][0])
+            with exporter.export(user=job.user_id) as document:
+                # Renamed once complete : downloads never read a partial file
+                with open(root / f"{file}.part", "wb") as output:
+                    shutil.copyfileobj(document, output)
+            os.replace(root / f"{file}.part", root / file)
+        except Exception as e:
+            print(f"While exporting {job.pk} : {e}")
+            (root / f"{file}.part").unlink(missing_ok=True)
+            fields = {"status": "failed", "error": str(e)[:999]}
+        else:
+            fields = {"status": "done", "file": file}
+        # Still running (not timed out meanwhile)
+        ExportJob.objects.filter(pk=job.pk, status="running").update(
+            finished_at=timezone.now(), **fields
+        )
+
+    @staticmethod
+    def download(*, job: ExportJob):
+        """
+        Opened file of a done job & its download name (None if not available)
+        """
+        if job.status != "done" or not job.file:
+            return None
+        try:
+            document = open(ExportService.root() / job.file, "rb")
+        except FileNotFoundError:
+            # Expired meanwhile
+            return None
+        return document, ExportService.EXPORTERS[job.kind][1]
+
+    @staticmethod
+    def expire():
+        """
+        Remove files of jobs done more than EXPORT_TTL seconds ago & fail jobs
+        running for more than EXPORT_TIMEOUT seconds.
+        Returns (expired, timed out) counts
+        """
+        now = timezone.now()
+        ttl = getattr(settings, "EXPORT_TTL", 60 * 60 * 24)
+        cutoff = now - timedelta(seconds=ttl)
+        root = ExportService.root()
+        jobs = dict(
+            ExportJob.objects.filter(status="done", finished_at__lt=cutoff)
+            .values_list("pk", "file")
+            .iterator()
+        )
+        for file in jobs.values():
+            if file:
+                (root / file).unlink(missing_ok=True)
+        expired = ExportJob.objects.filter(pk__in=jobs, status="done").update(
+            status="expired", file=None
+        )
+        if root.is_dir():
+            ExportService.remove_orphans(root=root, cutoff=cutoff)
+        timeout = getattr(settings, "EXPORT_TIMEOUT", 60 * 10)
+        timed_out = ExportJob.objects.filter(
+            status="running", started_at__lt=now - timedelta(seconds=timeout)
+        ).update(status="failed", error="Timed out.", finished_at=now)
+        return expired, timed_out
+
+    @staticmethod
+    def remove_orphans(*, root: Path, cutoff: datetime):
+        """
+        Remove job files of root older than cutoff that no done job owns
+        (interrupted writes, jobs deleted with their user).
+        Other files of root are never touched
+        """
+        for path in root.glob("*.xlsx*"):
+            name = path.name.removesuffix(".part")
+            try:
+                id = uuid.UUID(name.removesuffix(".xlsx"))
+            except ValueError:
+                continue
+            if name != f"{id}.xlsx" or not path.is_file():
+                continue
+            if path.stat().st_mtime >= cutoff.timestamp():
+                continue
+            if (
+                path.name == name
+                and ExportJob.objects.filter(pk=id, status="done", file=name).exists()
+            ):
+                continue
+            path.unlink(missing_ok=True)
+
+
+class TMDBUnavailable(Exception):
+    pass
+
+
+class TMDBThrottled(TMDBUnavailable):
+    pass
+
+
+class RateLimiter:
+    """
+    Token bucket (`rate` calls per second, bursts of `burst`) shared by the threads
+    of a process, plus a per-second counter in the cache. The counter limits all
+    workers together only with a shared backend with an atomic incr (Redis,
+    Memcached) : DatabaseCache.incr is a get + set, concurrent calls are lost.
+    Callers queue up to `max_wait` seconds for a slot, then are shed.
+    """
+
+    def __init__(self, *, rate: float, burst: int, max_wait: float, key: str):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.key = key
+        self.lock = threading.Lock()
+        self.tokens = burst
+        self.refilled_at = time.monotonic()
+        self.blocked_until = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.rate_limited = 0
+
+    def acquire(self):
+        deadline = time.monotonic() + self.max_wait
+        waited = False
+        while True:
+            delay = self.delay()
+            if delay == 0:
+                if waited:
+                    with self.lock:
+                        self.throttled += 1
+                return
+            if time.monotonic() + delay > deadline:
+                with self.lock:
+                    self.rejected += 1
+                raise TMDBThrottled("TMDB rate limit reached")
+            waited = True
+            time.sleep(delay)
+
+    def delay(self):
+        """
+        0 if a call may start now (its slot is taken), else seconds to wait.
+        Only the bucket is read under the lock : cache calls may be SQL queries
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.refilled_at) * self.rate
+            )
+            self.refilled_at = now
+            if time.time() < self.blocked_until:
+                return self.blocked_until - time.time()
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+
+        # Retry-After of another worker, then calls of every worker this second
+        delay = cache.get(f"{self.key}:blocked_until", 0) - time.time()
+        if delay <= 0:
+            window = f"{self.key}:{int(time.time())}"
+            try:
+                calls = cache.incr(window)
+            except ValueError:
+                calls = 1 if cache.add(window, 1, timeout=2) else cache.incr(window)
+            if calls <= self.rate:
+                return 0
+            delay = 1 - time.time() % 1
+        # Slot not used : token given back
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+        return delay
+
+    def block(self, *, seconds: float):
+        """
+        Honour a Retry-After, in this process and in the others
+        """
+        with self.lock:
+            self.rate_limited += 1
+            self.blocked_until = time.time() + seconds
+        cache.set(
+            f"{self.key}:blocked_until", self.blocked_until, timeout=int(seconds) + 1
+        )
+
+
+class CircuitBreaker:
+    """
+    Fails fast once `threshold` consecutive calls failed, lets one trial call
+    through every `reset_timeout` seconds until a call succeeds
+    """
+
+    def __init__(self, *, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Half-open : this call is the trial, others keep failing fast
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def success(self):
+        self.reset()
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+
 class TMDBService:
     """
     TMDB service class
     """
 
+    # Every TMDB fetch & revalidation of the process : TMDB_MAX_WORKERS threads at
+    # most, whatever the number of concurrent requests
+    _executor = ThreadPoolExecutor(
+        max_workers=getattr(settings, "TMDB_MAX_WORKERS", 8), thread_name_prefix="tmdb"
+    )
+    _revalidating = set()
+    _revalidating_lock = threading.Lock()
+    _inflight = {}
+    _inflight_lock = threading.Lock()
+    _breaker = CircuitBreaker(
+        threshold=getattr(settings, "TMDB_BREAKER_THRESHOLD", 5),
+        reset_timeout=getattr(settings, "TMDB_BREAKER_RESET_TIMEOUT", 30),
+    )
+    _session = None
+    _session_lock = threading.Lock()
+    _limiter = RateLimiter(
+        rate=getattr(settings, "TMDB_RATE_LIMIT", 40),
+        burst=getattr(settings, "TMDB_RATE_BURST", 10),
+        max_wait=getattr(settings, "TMDB_RATE_MAX_WAIT", 1),
+        key="tmdb:rate",
+    )
+
     def movie_details(movie_id: int):
-        movie = tmdb.Movies(movie_id)
-        response = movie.info(language="fr")
-        return response
+        return TMDBService.details(platform="movie", movie_id=movie_id)
 
     def tv_details(movie_id: int):
-        movie = tmdb.TV(movie_id)
-        response = movie.info(language="fr")
-        return response
+        return TMDBService.details(platform="tv", movie_id=movie_id)
+
+    @staticmethod
+    def details(*, platform: str, movie_id: int, language: str = None):
+        """
+        Cached TMDB details (served stale while revalidating once the TTL is over)
+        """
+        language = language or getattr(settings, "TMDB_LANGUAGE", "fr")
+        entry = TMDBCache.objects.filter(
+            platform=platform, movie_id=movie_id, language=language
+        ).first()
+        if entry is not None:
+            freshness = TMDBService.freshness(fetched_at=entry.fetched_at)
+            if freshness == "stale":
+                TMDBService.revalidate(
+                    platform=platform, movie_id=movie_id, language=language
+                )
+            if freshness != "expired":
+                return entry.payload
+        key = (platform, int(movie_id))
+        payload = TMDBService.resolve(keys={key}, language=language).get(key)
+        if payload is None and entry is not None:
+            return entry.payload
+        if payload is None:
+            raise TMDBUnavailable(f"TMDB details of {platform} {movie_id} unavailable")
+        return payload
+
+    @staticmethod
+    def prefetch(
+        *, keys: list[tuple[str, int]], language: str = None, budget: float = None
+    ):
+        """
+        Cached TMDB details of many (platform, movie_id), misses fetched in parallel.
+        Returns (details, degraded keys) : titles TMDB could not provide within the
+        budget (seconds) are served from expired cache entries, or left out.
+        """
+        deadline = None if budget is None else time.monotonic() + budget
+        language = language or getattr(settings, "TMDB_LANGUAGE", "fr")
+        keys = {(platform, int(movie_id)) for platform, movie_id in keys}
+        if not keys:
+            return {}, set()
+
+        query = Q()
+        for platform, movie_id in keys:
+            query |= Q(platform=platform, movie_id=movie_id)
+        details = {}
+        expired = {}
+        for entry in TMDBCache.objects.filter(query, language=language):
+            freshness = TMDBService.freshness(fetched_at=entry.fetched_at)
+            if freshness == "stale":
+                TMDBService.revalidate(
+                    platform=entry.platform, movie_id=entry.movie_id, language=language
+                )
+            if freshness == "expired":
+                expired[(entry.platform, entry.movie_id)] = entry.payload
+            else:
+                details[(entry.platform, entry.movie_id)] = entry.payload
+
+        missing = keys - details.keys()
+        if missing:
+            details.update(
+                TMDBService.resolve(keys=missing, language=language, deadline=deadline)
+            )
+        degraded = keys - details.keys()
+        for key in degraded & expired.keys():
+            details[key] = expired[key]
+        return details, degraded
+
+    @staticmethod
+    def parse_keys(*, ids: str, maximum: int = 50):
+        """
+        "movie:1,tv:2" to [("movie", 1), ("tv", 2)] (raises ValueError)
+        """
+        keys = []
+        for value in ids.split(","):
+            platform, _, movie_id = value.strip().partition(":")
+            if platform not in ("movie", "tv"):
+                raise ValueError(f"Invalid id {value}, expected movie:<id> or tv:<id>")
+            keys.append((platform, int(movie_id)))
+        if len(keys) > maximum:
+            raise ValueError(f"At most {maximum} ids per request")
+        return keys
+
+    @staticmethod
+    def resolve(*, keys: set[tuple[str, int]], language: str, deadline: float = None):
+        """
+        Fetch and cache missing titles, each title fetched by a single worker at a time
+        """
+        locked = {
+            (platform, movie_id)
+            for platform, movie_id in keys
+            if TMDBService.lock(platform=platform, movie_id=movie_id, language=language)
+        }
+        try:
+            details = TMDBService.fetch_many(
+                keys=locked, language=language, deadline=deadline
+            )
+        finally:
+            for platform, movie_id in locked:
+                TMDBService.unlock(
+                    platform=platform, movie_id=movie_id, language=language
+                )
+
+        # Fetched by another worker : wait for its cache entry, then fetch leftovers
+        waiting = keys - locked
+        if waiting:
+            details.update(
+                TMDBService.wait_for(keys=waiting, language=language, deadline=deadline)
+            )
+            details.update(
+                TMDBService.fetch_many(
+                    keys=waiting - details.keys(), language=language, deadline=deadline
+                )
+            )
+        return details
+
+    @staticmethod
+    def fetch_many(
+        *, keys: set[tuple[str, int]], language: str, deadline: float = None
+    ):
+        """
+        Fetch titles in parallel (process-wide thread pool) and cache them.
+        Failed titles are left out, so are titles still running at the deadline
+        (the ones still queued are cancelled).
+        """
+        if not keys or (deadline is not None and time.monotonic() >= deadline):
+            return {}
+        futures = {
+            (platform, movie_id): TMDBService._executor.submit(
+                TMDBService.fetch_before,
+                platform=platform,
+                movie_id=movie_id,
+                language=language,
+                deadline=deadline,
+            )
+            for platform, movie_id in keys
+        }
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        done, not_done = wait(futures.values(), timeout=timeout)
+        for future in not_done:
+            future.cancel()
+
+        # Cache writes stay on the calling thread (and its DB connection)
+        details = {}
+        for (platform, movie_id), future in futures.items():
+            if future not in done:
+                continue
+            try:
+                details[(platform, movie_id)] = future.result()
+            except Exception as e:
+                print("While fetching TMDB details :", e)
+                continue
+            TMDBService.store(
+                platform=platform,
+                movie_id=movie_id,
+                language=language,
+                payload=details[(platform, movie_id)],
+            )
+        return details
+
+    @staticmethod
+    def fetch_before(*, platform: str, movie_id: int, language: str, deadline: float):
+        """
+        TMDBService.fetch_shared, cached from the worker thread when it ends after
+        the deadline (the caller did not wait for it). Skipped when the deadline
+        passed while queued
+        """
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TMDBUnavailable(f"TMDB details of {platform} {movie_id} too late")
+        payload = TMDBService.fetch_shared(
+            platform=platform, movie_id=movie_id, language=language
+        )
+        if deadline is not None and time.monotonic() >= deadline:
+            try:
+                TMDBService.store(
+                    platform=platform,
+                    movie_id=movie_id,
+                    language=language,
+                    payload=payload,
+                )
+            except Exception as e:
+                print("While caching late TMDB details :", e)
+            finally:
+                connection.close()
+        return payload
+
+    @staticmethod
+    def wait_for(*, keys: set[tuple[str, int]], language: str, deadline: float = None):
+        """
+        Poll the cache until other workers stored the titles (or TMDB_LOCK_TIMEOUT)
+        """
+        timeout = time.monotonic() + getattr(settings, "TMDB_LOCK_TIMEOUT", 10)
+        if deadline is not None:
+            timeout = min(timeout, deadline)
+        details = {}
+        while True:
+            query = Q()
+            for platform, movie_id in keys - details.keys():
+                query |= Q(platform=platform, movie_id=movie_id)
+            for entry in TMDBCache.objects.filter(query, language=language):
+                if TMDBService.freshness(fetched_at=entry.fetched_at) != "expired":
+                    details[(entry.platform, entry.movie_id)] = entry.payload
+            if details.keys() == keys or time.monotonic() >= timeout:
+                return details
+            time.sleep(0.05)
+
+    @staticmethod
+    def lock(*, platform: str, movie_id: int, language: str):
+        """
+        Lock on a title, held while it is fetched (cross-process only if CACHES
+        is a shared backend)
+        """
+        return cache.add(
+            f"tmdb:lock:{platform}:{movie_id}:{language}",
+            True,
+            timeout=getattr(settings, "TMDB_LOCK_TIMEOUT", 10),
+        )
+
+    @staticmethod
+    def unlock(*, platform: str, movie_id: int, language: str):
+        cache.delete(f"tmdb:lock:{platform}:{movie_id}:{language}")
+
+    @staticmethod
+    def freshness(*, fetched_at):
+        """
+        "fresh", "stale" or "expired" depending on cache entry age
+        """
+        age = (timezone.now() - fetched_at).total_seconds()
+        ttl = getattr(settings, "TMDB_CACHE_TTL", 60 * 60 * 24)
+        stale_ttl = getattr(settings, "TMDB_CACHE_STALE_TTL", 60 * 60 * 24 * 7)
+        if age < ttl:
+            return "fresh"
+        if age < ttl + stale_ttl:
+            return "stale"
+        return "expired"
+
+    @staticmethod
+    def project(*, platform: str, response: dict):
+        """
+        TMDB response fields shown in movie lists (what the cache stores).
+        Already projected payloads are returned as is.
+        """
+        if "synopsis" in response:
+            return dict(response)
+        if platform == "movie":
+            released_date = response.get("release_date")
+        else:
+            released_date = response.get("first_air_date")
+        details = {
+            "released_date": released_date,
+            "poster_path": response.get("poster_path"),
+            "synopsis": response.get("overview"),
+            "backdrop_path": response.get("backdrop_path"),
+        }
+        directors = [
+            member.get("name")
+            for member in (response.get("credits") or {}).get("crew", [])
+            if member.get("job") == "Director"
+        ]
+        if response.get("created_by"):
+            details["director"] = response["created_by"][0].get("name")
+        elif directors:
+            details["director"] = directors[0]
+        return details
+
+    @staticmethod
+    def denormalized_fields(*, platform: str, movie_id: int):
+        """
+        MovieBaseModel TMDB fields of a movie ({} if TMDB is unavailable)
+        """
+        try:
+            response = TMDBService.details(platform=platform, movie_id=movie_id)
+        except Exception as e:
+            print("While getting TMDB details :", e)
+            return {}
+        return {
+            "director": None,
+            **TMDBService.project(platform=platform, response=response),
+            "details_updated_at": timezone.now(),
+        }
+
+    @staticmethod
+    def fetch(*, platform: str, movie_id: int, language: str):
+        """
+        Call TMDB API (no cache), details and credits in one request
+        """
+        if platform == "tv":
+            resource = tmdb.TV(movie_id)
+        else:
+            resource = tmdb.Movies(movie_id)
+        base_url = getattr(settings, "TMDB_BASE_URL", "https://api.themoviedb.org")
+        resource.base_uri = f"{base_url}/{tmdb.API_VERSION}"
+        resource.session = TMDBService.session()
+        # tmdbsimple sends "Connection: close" by default
+        resource.headers = {**resource.headers, "Connection": "keep-alive"}
+        resource.timeout = (
+            getattr(settings, "TMDB_CONNECT_TIMEOUT", 2),
+            getattr(settings, "TMDB_READ_TIMEOUT", 5),
+        )
+        response = resource.info(language=language, append_to_response="credits")
+        return TMDBService.project(platform=platform, response=response)
+
+    @staticmethod
+    def session():
+        """
+        Shared keep-alive HTTP session (connection pool, retries with backoff)
+        """
+        with TMDBService._session_lock:
+            if TMDBService._session is None:
+                retries = Retry(
+                    total=getattr(settings, "TMDB_RETRIES", 2),
+                    backoff_factor=getattr(settings, "TMDB_RETRY_BACKOFF", 0.3),
+                    status_forcelist=(500, 502, 503, 504),
+                    allowed_methods=("GET",),
+                    raise_on_status=False,
+                )
+                pool_size = getattr(settings, "TMDB_POOL_SIZE", 10)
+                adapter = HTTPAdapter(
+                    pool_connections=pool_size,
+                    pool_maxsize=pool_size,
+                    max_retries=retries,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                TMDBService._session = session
+            return TMDBService._session
+
+    @staticmethod
+    def stats():
+        """
+        TMDB client counters of this process
+        """
+        requests_count = 0
+        connections_count = 0
+        if TMDBService._session is not None:
+            pools = TMDBService._session.get_adapter("https://").poolmanager.pools
+            for key in pools.keys():
+                requests_count += pools[key].num_requests
+                connections_count += pools[key].num_connections
+        return {
+            "requests": requests_count,
+            "connections": connections_count,
+            "connection_reuse_rate": (
+                1 - connections_count / requests_count if requests_count else None
+            ),
+            "circuit_breaker": TMDBService._breaker.state,
+            "throttled": TMDBService._limiter.throttled,
+            "rejected": TMDBService._limiter.rejected,
+            "rate_limited": TMDBService._limiter.rate_limited,
+        }
+
+    @staticmethod
+    def store(*, platform: str, movie_id: int, language: str, payload: dict):
+        """
+        Insert or replace a cache entry
+        """
+        TMDBCache.objects.update_or_create(
+            platform=platform,
+            movie_id=movie_id,
+            language=language,
+            defaults={"payload": payload, "fetched_at": timezone.now()},
+        )
+
+    @staticmethod
+    def fetch_shared(*, platform: str, movie_id: int, language: str):
+        """
+        Call TMDB API, concurrent calls for the same title share one request
+        """
+        key = (platform, int(movie_id), language)
+        with TMDBService._inflight_lock:
+            future = TMDBService._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                TMDBService._inflight[key] = future
+        if not is_leader:
+            return future.result()
+
+        try:
+            if not TMDBService._breaker.allow():
+                raise TMDBUnavailable("TMDB circuit breaker is open")
+            TMDBService._limiter.acquire()
+            payload = TMDBService.fetch(
+                platform=platform, movie_id=movie_id, language=language
+            )
+        except TMDBUnavailable as e:
+            future.set_exception(e)
+            raise
+        except Exception as e:
+            retry_after = TMDBService.retry_after(error=e)
+            if retry_after is not None:
+                TMDBService._limiter.block(seconds=retry_after)
+            elif TMDBService.is_outage(error=e):
+                TMDBService._breaker.failure()
+            else:
+                TMDBService._breaker.success()
+            future.set_exception(e)
+            raise
+        else:
+            TMDBService._breaker.success()
+            future.set_result(payload)
+            return payload
+        finally:
+            with TMDBService._inflight_lock:
+                del TMDBService._inflight[key]
+
+    @staticmethod
+    def is_outage(*, error: Exception):
+        """
+        False for TMDB answers about the title itself (404...), True otherwise
+        """
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code >= 500
+        return True
+
+    @staticmethod
+    def retry_after(*, error: Exception):
+        """
+        Seconds to wait after a 429 (Retry-After header, 1 by default), else None
+        """
+        if not isinstance(error, requests.HTTPError) or error.response is None:
+            return None
+        if error.response.status_code != 429:
+            return None
+        try:
+            return float(error.response.headers.get("Retry-After", 1))
+        except ValueError:
+            return 1.0
+
+    @staticmethod
+    def revalidate(*, platform: str, movie_id: int, language: str):
+        """
+        Refresh a stale cache entry in the background (once per key)
+        """
+        key = (platform, int(movie_id), language)
+        with TMDBService._revalidating_lock:
+            if key in TMDBService._revalidating:
+                return
+            TMDBService._revalidating.add(key)
+
+        def run():
+            # Skipped when another worker already revalidates this title
+            locked = TMDBService.lock(
+                platform=platform, movie_id=movie_id, language=language
+            )
+            try:
+                if locked:
+                    # Fetched on this pool thread : no nested submit to the pool
+                    TMDBService.store(
+                        platform=platform,
+                        movie_id=movie_id,
+                        language=language,
+                        payload=TMDBService.fetch_shared(
+                            platform=platform, movie_id=movie_id, language=language
+                        ),
+                    )
+            except Exception as e:
+                print("While revalidating TMDB cache :", e)
+            finally:
+                if locked:
+                    TMDBService.unlock(
+                        platform=platform, movie_id=movie_id, language=language
+                    )
+                with TMDBService._revalidating_lock:
+                    TMDBService._revalidating.discard(key)
+                connection.close()
+
+        TMDBService._executor.submit(run)
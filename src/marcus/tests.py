@@ -1,9 +1,58 @@
+import io
+import os
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
+
+import requests
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
 from django.urls import reverse
 from django.contrib.auth.models import User
-from django.test import TestCase, RequestFactory
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.state import ProjectState
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .services import CriticService, MasterpieceService, VoteService, WatchlistService
+from .models import (
+    Critic,
+    ExportJob,
+    Masterpiece,
+    MovieRating,
+    Tag,
+    TMDBCache,
+    UserStats,
+    Vote,
+    Watchlist,
+)
+from .services import (
+    CriticService,
+    MasterpieceService,
+    RateLimiter,
+    TagService,
+    TMDBService,
+    TMDBThrottled,
+    TMDBUnavailable,
+    ToolkitService,
+    VoteService,
+    WatchlistService,
+)
+from .tmdb_standin import TMDBStandinServer
+from marcus_music.models import Masterpiece as MusicMasterpiece, Vote as MusicVote
+from marcus_music.services import CriticService as MusicCriticService
 
 
 def get_tokens_for_user(user):
@@ -60,8 +109,315 @@ class UserTest(TestCase):
         self.assertEqual(response.status_code, 201)
 
 
+class UserStatsTest(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f"statsuser{index}") for index in range(3)
+        ]
+        for index, user in enumerate(self.users):
+            for movie_id in range(index + 1):
+                fields = {
+                    "user": user,
+                    "movie_id": movie_id,
+                    "movie_name": "movie name",
+                    "platform": "movie",
+                }
+                Critic.objects.create(content="critic", **fields)
+                Vote.objects.create(value=4, **fields)
+            Masterpiece.objects.create(
+                user=user, movie_id=1, movie_name="movie name", platform="movie"
+            )
+        MusicVote.objects.create(
+            user=self.users[0],
+            value=3,
+            album_id="1",
+            album_name="album",
+            artist_id="1",
+            artist_name="artist",
+            image_url="url",
+            genders="Rock",
+        )
+
+    def test_users_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("users"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [
+                (user["user_critics"], user["user_votes"], user["user_masterpieces"])
+                for user in response.data
+            ],
+            [(1, 2, 1), (2, 2, 1), (3, 3, 1)],
+        )
+        self.assertEqual(response.data[0]["user_watchlists"], 0)
+
+    def test_users_pagination_and_search(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("users"), {"page": 1, "search": "USER1"})
+        self.assertEqual(response.data["total"], 1)
+        self.assertEqual(response.data["data"][0]["username"], "statsuser1")
+
+    def test_user_details_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("user_details", args=[self.users[2].id]))
+        self.assertEqual(response.data["user_critics"], 3)
+        self.assertEqual(
+            self.client.get(reverse("user_details", args=[0])).status_code, 404
+        )
+
+
+@mock.patch.object(TMDBService, "denormalized_fields", return_value={})
+class MovieUniqueWriteTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser")
+        UserStats.objects.create(user=self.user)
+        self.fields = {
+            "movie_id": 1,
+            "movie_name": "movie name",
+            "platform": "movie",
+            "tags": "Action",
+            "user": self.user,
+        }
+
+    def test_create_single_insert(self, _):
+        # Title already rated : its first write does not aggregate the tables
+        MovieRating.objects.create(platform="movie", movie_id=1)
+        for model, service in (
+            (Masterpiece, MasterpieceService),
+            (Watchlist, WatchlistService),
+        ):
+            with self.subTest(model=model.__name__):
+                for status_code in (201, 400):
+                    with CaptureQueriesContext(connection) as queries:
+                        _, code = service.create(**self.fields)
+                    self.assertEqual(code, status_code)
+                    table = [
+                        query["sql"]
+                        for query in queries
+                        if f'"{model._meta.db_table}"' in query["sql"]
+                    ]
+                    self.assertEqual(len(table), 1)
+                    self.assertTrue(table[0].startswith("INSERT"))
+                self.assertEqual(model.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(UserStats.objects.get(user=self.user).masterpieces, 1)
+
+    def test_tmdb_outside_transaction(self, denormalized_fields):
+        # No write transaction (and its database locks) held during TMDB calls
+        depth = len(connection.atomic_blocks)
+        depths = []
+        denormalized_fields.side_effect = lambda **kwargs: (
+            depths.append(len(connection.atomic_blocks)) or {}
+        )
+        MasterpieceService.create(**self.fields)
+        WatchlistService.create(**self.fields)
+        VoteService.create(value=4, **self.fields)
+        CriticService.create(content="critic", **self.fields)
+        self.assertEqual(depths, [depth] * 4)
+
+    def test_create_duplicates(self, _):
+        _, status_code = VoteService.create(value=4, **self.fields)
+        self.assertEqual(status_code, 201)
+        _, status_code = VoteService.create(value=2, **self.fields)
+        self.assertEqual(status_code, 400)
+        _, status_code = CriticService.create(content="critic", **self.fields)
+        self.assertEqual(status_code, 201)
+        _, status_code = CriticService.create(content="other", **self.fields)
+        self.assertEqual(status_code, 400)
+        self.assertEqual(Vote.objects.get(user=self.user).value, 4)
+        self.assertEqual(UserStats.objects.get(user=self.user).votes, 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Critic.objects.create(content="critic", **self.fields)
+
+
+class UserStatsCountersTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser")
+        self.fields = {
+            "movie_name": "movie name",
+            "platform": "movie",
+            "tags": "Action",
+            "user": self.user,
+        }
+
+    def stats(self):
+        return UserStats.objects.values(
+            "critics", "masterpieces", "watchlists", "votes"
+        ).get(user=self.user)
+
+    @mock.patch.object(TMDBService, "denormalized_fields", return_value={})
+    def test_services_maintain_counters(self, _):
+        # Rows created before UserStats are counted on first write
+        Vote.objects.create(value=3, movie_id=9, **self.fields)
+        VoteService.create(value=4, movie_id=1, **self.fields)
+        VoteService.create(value=4, movie_id=1, **self.fields)
+        CriticService.create(content="critic", movie_id=1, **self.fields)
+        MasterpieceService.create(movie_id=1, **self.fields)
+        WatchlistService.create(movie_id=2, **self.fields)
+        self.assertEqual(
+            self.stats(),
+            {"critics": 1, "masterpieces": 1, "watchlists": 1, "votes": 2},
+        )
+
+        VoteService.delete(movie_id=1, user=self.user)
+        VoteService.delete(movie_id=1, user=self.user)
+        WatchlistService.delete(movie_id=2, user=self.user)
+        self.assertEqual(
+            self.stats(),
+            {"critics": 1, "masterpieces": 1, "watchlists": 0, "votes": 1},
+        )
+
+    def test_users_read_counters(self):
+        UserStats.objects.create(user=self.user, critics=42)
+        Critic.objects.create(content="critic", movie_id=1, **self.fields)
+        response = self.client.get(reverse("user_details", args=[self.user.id]))
+        self.assertEqual(response.data["user_critics"], 42)
+
+    def test_recompute_user_stats(self):
+        UserStats.objects.create(user=self.user, critics=42)
+        Critic.objects.create(content="critic", movie_id=1, **self.fields)
+        other = User.objects.create_user(username="otheruser")
+        Watchlist.objects.create(movie_id=1, **{**self.fields, "user": other})
+
+        out = io.StringIO()
+        call_command("recompute_user_stats", "--batch-size", "1", stdout=out)
+        self.assertIn("2 users recomputed", out.getvalue())
+        self.assertEqual(self.stats()["critics"], 1)
+        self.assertEqual(UserStats.objects.get(user=other).watchlists, 1)
+
+
+class DedupeMovieEntriesTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser")
+        self.fields = {
+            "movie_name": "movie name",
+            "platform": "movie",
+            "tags": "Action",
+        }
+        # Databases migrated before the unique constraint : tables rebuilt from
+        # migration states without it (SQLite), then with it
+        state = ProjectState.from_apps(apps)
+        self.models = state.apps
+        bare = state.clone()
+        for model in (Vote, Critic):
+            constraint = model._meta.constraints[0]
+            bare.remove_constraint(
+                model._meta.app_label, model._meta.model_name, constraint.name
+            )
+            with connection.schema_editor() as editor:
+                editor.remove_constraint(
+                    bare.apps.get_model(model._meta.label), constraint
+                )
+            self.addCleanup(self.restore, model, constraint)
+
+    def restore(self, model, constraint):
+        model.objects.all().delete()
+        with connection.schema_editor() as editor:
+            editor.add_constraint(self.models.get_model(model._meta.label), constraint)
+
+    def test_dedupe_movie_entries(self):
+        kept = Vote.objects.create(value=4, movie_id=1, user=self.user, **self.fields)
+        for value in (1, 2):
+            Vote.objects.create(value=value, movie_id=1, user=self.user, **self.fields)
+        Vote.objects.create(value=3, movie_id=2, user=self.user, **self.fields)
+        for content in ("first", "second"):
+            Critic.objects.create(
+                content=content, movie_id=1, user=self.user, **self.fields
+            )
+        TagService.link(objects=list(Vote.objects.all()), source="tags")
+
+        out = io.StringIO()
+        call_command("dedupe_movie_entries", "--dry-run", stdout=out)
+        self.assertIn("Vote : 2 duplicates", out.getvalue())
+        self.assertEqual(Vote.objects.count(), 4)
+
+        out = io.StringIO()
+        call_command("dedupe_movie_entries", "--batch-size", "1", stdout=out)
+        self.assertIn("Vote : 2 duplicates", out.getvalue())
+        self.assertIn("Critic : 1 duplicates", out.getvalue())
+        self.assertIn("1 users & 1 titles recomputed", out.getvalue())
+        self.assertEqual(
+            set(Vote.objects.values_list("pk", flat=True)),
+            {kept.pk, Vote.objects.get(movie_id=2).pk},
+        )
+        self.assertEqual(Critic.objects.get().content, "first")
+        self.assertEqual(Vote.tag_index.through.objects.count(), 2)
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.votes, stats.critics), (2, 1))
+        rating = MovieRating.objects.get(platform="movie", movie_id=1)
+        self.assertEqual((rating.votes, rating.votes_sum, rating.critics), (1, 4, 1))
+
+
+class MovieRatingTest(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f"voter{index}") for index in range(3)
+        ]
+        self.fields = {"movie_name": "movie name", "platform": "movie", "tags": None}
+
+    def ratings(self, ids):
+        response = self.client.get(reverse("movie_ratings"), {"ids": ids})
+        self.assertEqual(response.status_code, 200)
+        return response.data["data"]
+
+    @mock.patch.object(TMDBService, "denormalized_fields", return_value={})
+    def test_services_maintain_ratings(self, _):
+        # Rows created before the rating are aggregated on first write
+        Vote.objects.create(value=1, movie_id=1, user=self.users[0], **self.fields)
+        VoteService.create(value=4.5, movie_id="1", user=self.users[1], **self.fields)
+        VoteService.create(value=4.5, movie_id="1", user=self.users[1], **self.fields)
+        VoteService.create(value=3, movie_id="1", user=self.users[2], **self.fields)
+        CriticService.create(
+            content="critic", movie_id="1", user=self.users[0], **self.fields
+        )
+        MasterpieceService.create(movie_id="1", user=self.users[1], **self.fields)
+        VoteService.delete(movie_id="1", user=self.users[2])
+        self.assertEqual(MovieRating.objects.count(), 1)
+
+        with self.assertNumQueries(1):
+            data = self.ratings("movie:1,tv:1")
+        rating = data["movie:1"]
+        self.assertEqual(rating["votes"], 2)
+        self.assertEqual(rating["mean"], 2.75)
+        self.assertEqual(rating["histogram"]["1.0"], 1)
+        self.assertEqual(rating["histogram"]["4.5"], 1)
+        self.assertEqual(sum(rating["histogram"].values()), 2)
+        self.assertEqual((rating["critics"], rating["masterpieces"]), (1, 1))
+        # Title without rating
+        self.assertEqual(data["tv:1"]["votes"], 0)
+        self.assertIsNone(data["tv:1"]["mean"])
+
+    def test_invalid_ids(self):
+        for ids in ("", "movie:abc", "book:1"):
+            response = self.client.get(reverse("movie_ratings"), {"ids": ids})
+            self.assertEqual(response.status_code, 400)
+
+    def test_recompute_movie_ratings(self):
+        MovieRating.objects.create(platform="movie", movie_id=1, votes=42)
+        MovieRating.objects.create(platform="tv", movie_id=7, critics=3)
+        Vote.objects.create(value=2, movie_id=1, user=self.users[0], **self.fields)
+        Vote.objects.create(value=5, movie_id=1, user=self.users[1], **self.fields)
+        Critic.objects.create(
+            content="critic", movie_id=2, user=self.users[0], **self.fields
+        )
+
+        out = io.StringIO()
+        call_command("recompute_movie_ratings", "--batch-size", "1", stdout=out)
+        self.assertIn("2 titles recomputed", out.getvalue())
+        data = self.ratings("movie:1,movie:2,tv:7")
+        self.assertEqual((data["movie:1"]["votes"], data["movie:1"]["mean"]), (2, 3.5))
+        self.assertEqual(data["movie:1"]["histogram"]["5.0"], 1)
+        self.assertEqual(data["movie:2"]["critics"], 1)
+        # Stale title removed
+        self.assertFalse(MovieRating.objects.filter(platform="tv").exists())
+
+
 class MovieVoteTest(TestCase):
     def setUp(self):
+        # No live TMDB calls (creates & lists read details)
+        TMDBService._breaker.reset()
+        patcher = mock.patch.object(TMDBService, "fetch", return_value={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
         self.user = User.objects.create_user(username="testuser")
         self.service = VoteService()
         self.url = reverse("votes")
@@ -133,6 +489,11 @@ class MovieVoteTest(TestCase):
 
 class MovieCriticTest(TestCase):
     def setUp(self):
+        # No live TMDB calls (creates & lists read details)
+        TMDBService._breaker.reset()
+        patcher = mock.patch.object(TMDBService, "fetch", return_value={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
         self.user = User.objects.create_user(username="testuser")
         self.service = CriticService()
         self.url = reverse("critics")
@@ -157,6 +518,8 @@ class MovieCriticTest(TestCase):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json().get("total"), 1)
+        response = self.client.get(self.url, {"movie_id": "abc"})
+        self.assertEqual(response.status_code, 400)
 
         # Delete
         response = self.client.delete(
@@ -190,16 +553,45 @@ class MovieCriticTest(TestCase):
         self.assertEqual(len(list), 1)
 
         # list_by_movie_id_and_aggregate_votes()
-        list = self.service.list_by_movie_id_and_aggregate_votes(movie="1")
+        list, _ = self.service.list_by_movie_id_and_aggregate_votes(movie="1")
         self.assertEqual(len(list), 1)
 
         # delete()
         status_code = self.service.delete(user=self.user, movie_id="1")
         self.assertEqual(status_code, 204)
 
+    def test_critic_export(self):
+        other = User.objects.create_user(username="otheruser")
+        for index, user in enumerate((self.user, self.user, other)):
+            Critic.objects.create(
+                user=user,
+                movie_id=index,
+                movie_name=f"movie {index}",
+                content=f"critic {index}",
+                platform="tv" if index else "movie",
+                tags="Action",
+            )
+        response = self.client.get(reverse("critics_export"), {"user_id": self.user.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        document = b"".join(response.streaming_content)
+        self.assertEqual(int(response["Content-Length"]), len(document))
+        with zipfile.ZipFile(io.BytesIO(document)) as archive:
+            sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+        # Header + the user's critics, newest first
+        self.assertEqual(sheet.count("<row "), 3)
+        self.assertLess(sheet.index("critic 1"), sheet.index("critic 0"))
+        self.assertIn("Série", sheet)
+        self.assertNotIn("critic 2", sheet)
+
 
 class MovieWatchlistTest(TestCase):
     def setUp(self):
+        # No live TMDB calls (creates & lists read details)
+        TMDBService._breaker.reset()
+        patcher = mock.patch.object(TMDBService, "fetch", return_value={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
         self.user = User.objects.create_user(username="testuser")
         self.service = WatchlistService()
         self.url = reverse("watchlists")
@@ -260,6 +652,11 @@ class MovieWatchlistTest(TestCase):
 
 class MovieMasterpieceTest(TestCase):
     def setUp(self):
+        # No live TMDB calls (creates & lists read details)
+        TMDBService._breaker.reset()
+        patcher = mock.patch.object(TMDBService, "fetch", return_value={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
         self.user = User.objects.create_user(username="testuser")
         self.service = MasterpieceService()
         self.url = reverse("masterpieces")
@@ -316,3 +713,1134 @@ class MovieMasterpieceTest(TestCase):
         # delete()
         status_code = self.service.delete(user=self.user, movie_id="872585")
         self.assertEqual(status_code, 204)
+
+
+class MovieListQueriesTest(TestCase):
+    def setUp(self):
+        users = [
+            User.objects.create_user(username=f"author{index}") for index in range(3)
+        ]
+        for index in range(12):
+            fields = {
+                "user": users[index % 3],
+                "movie_id": index,
+                "movie_name": f"movie {index}",
+                "platform": "movie",
+                "tags": "Action",
+                "details_updated_at": timezone.now(),
+            }
+            Masterpiece.objects.create(**fields)
+            Watchlist.objects.create(**fields)
+            Vote.objects.create(value=4, **fields)
+            Critic.objects.create(content="critic", **fields)
+
+    def test_list_query_count(self):
+        # Count + page, whatever the number of rows and authors
+        for name in ("masterpieces", "watchlists", "votes", "critics"):
+            cache.clear()
+            with self.subTest(endpoint=name), self.assertNumQueries(2):
+                response = self.client.get(reverse(name), {"page_size": 12})
+            self.assertEqual(len(response.data["data"]), 12)
+            self.assertEqual(
+                {row["user_name"] for row in response.data["data"]},
+                {"author0", "author1", "author2"},
+            )
+
+    def test_critics_by_movie(self):
+        author = User.objects.get(username="author0")
+        voter = User.objects.create_user(username="voter")
+        for user in User.objects.exclude(pk=voter.pk):
+            Critic.objects.create(
+                user=user,
+                movie_id=100,
+                movie_name="movie 100",
+                platform="movie",
+                content=f"critic of {user.username}",
+            )
+        Vote.objects.create(
+            user=author, movie_id=100, movie_name="movie 100", platform="movie", value=3
+        )
+        # Another movie's vote of the same author
+        Vote.objects.filter(user=author, movie_id=0).update(value=1)
+        Vote.objects.create(
+            user=voter, movie_id=100, movie_name="movie 100", platform="movie", value=5
+        )
+        cache.clear()
+        # Count + page, votes & usernames joined in SQL
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse("critics"), {"movie_id": 100, "page_size": 2}
+            )
+        self.assertEqual(response.data["total"], 3)
+        self.assertFalse(response.data["is_last_page"])
+        response = self.client.get(
+            reverse("critics"), {"movie_id": 100, "page": 2, "page_size": 2}
+        )
+        self.assertEqual(len(response.data["data"]), 1)
+        response = self.client.get(reverse("critics"), {"movie_id": 100})
+        votes = {row["user_name"]: row["vote"] for row in response.data["data"]}
+        self.assertEqual(votes, {"author0": 3.0, "author1": None, "author2": None})
+        self.assertEqual(
+            response.data["data"][0]["content"],
+            Critic.objects.filter(movie_id=100).latest("created_at").content,
+        )
+
+    def test_list_columns(self):
+        # Only what serializers read
+        masterpiece = MasterpieceService.list(user=None, tag=None)[0].first()
+        self.assertEqual(masterpiece.get_deferred_fields(), set())
+        vote = VoteService.list(user=None, stars=None, movie_id=None, tag=None)[0]
+        self.assertIn("synopsis", vote.first().get_deferred_fields())
+        self.assertNotIn("username", masterpiece.user.get_deferred_fields())
+
+
+class ListTotalTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser")
+        for movie_id in range(15):
+            Critic.objects.create(
+                user=self.user,
+                movie_id=movie_id,
+                movie_name="movie name",
+                platform="movie",
+                content="critic",
+            )
+
+    def test_exact_total_with_local_cache(self):
+        # Process-local cache : other processes' writes must show up
+        for total in (15, 16):
+            with self.assertNumQueries(2):
+                response = self.client.get(reverse("critics"), {"page": 2})
+            self.assertEqual(response.data["total"], total)
+            Critic.objects.create(
+                user=self.user,
+                movie_id=total,
+                movie_name="movie name",
+                platform="movie",
+                content="critic",
+            )
+
+    @mock.patch.object(ToolkitService, "shared_cache", return_value=True)
+    def test_cached_total(self, _):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("critics"), {"page": 1})
+        self.assertEqual(response.data["total"], 15)
+        # Same filters : cached total
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("critics"), {"page": 2})
+        self.assertEqual(response.data["total"], 15)
+        # Other filters : own total
+        response = self.client.get(reverse("critics"), {"tag": "Drame"})
+        self.assertEqual(response.data["total"], 0)
+
+        # Writes through the services drop cached totals
+        with mock.patch.object(TMDBService, "denormalized_fields", return_value={}):
+            CriticService.create(
+                movie_id=99,
+                movie_name="movie name",
+                content="critic",
+                platform="movie",
+                tags="Drame",
+                user=self.user,
+            )
+        response = self.client.get(reverse("critics"), {"page": 2})
+        self.assertEqual(response.data["total"], 16)
+        response = self.client.get(reverse("critics"), {"tag": "Drame"})
+        self.assertEqual(response.data["total"], 1)
+
+    def test_count_free(self):
+        for page, size, is_last_page in ((1, 10, False), (2, 5, True), (3, 0, True)):
+            with self.assertNumQueries(1):
+                response = self.client.get(
+                    reverse("critics"), {"page": page, "total": "none"}
+                )
+            self.assertIsNone(response.data["total"])
+            self.assertEqual(len(response.data["data"]), size)
+            self.assertEqual(response.data["is_last_page"], is_last_page)
+        self.assertEqual((response.data["from"], response.data["to"]), (0, 0))
+
+
+@mock.patch.object(TMDBService, "denormalized_fields", return_value={})
+class TagIndexTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        # No live TMDB calls (lists read details)
+        TMDBService._breaker.reset()
+        patcher = mock.patch.object(TMDBService, "fetch", return_value={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="testuser")
+
+    def create(self, *, movie_id: int, tags: str):
+        MasterpieceService.create(
+            movie_id=movie_id,
+            movie_name="movie name",
+            platform="movie",
+            tags=tags,
+            user=self.user,
+        )
+
+    def test_tag_filter(self, _):
+        self.create(movie_id=1, tags="Action,Science-Fiction")
+        self.create(movie_id=2, tags="Action Comics")
+        self.create(movie_id=3, tags=None)
+
+        def movie_ids(tag):
+            response = self.client.get(reverse("masterpieces"), {"tag": tag})
+            return {masterpiece["movie_id"] for masterpiece in response.data["data"]}
+
+        # Whole tags only (no substring match)
+        self.assertEqual(movie_ids("Action"), {1})
+        self.assertEqual(movie_ids("Action Comics"), {2})
+        self.assertEqual(movie_ids("Science"), set())
+        self.assertEqual(movie_ids("Tous"), {1, 2, 3})
+        self.assertEqual(Tag.objects.count(), 3)
+
+    def test_reindex_tags(self, _):
+        Masterpiece.objects.create(
+            user=self.user,
+            movie_id=1,
+            movie_name="movie name",
+            platform="movie",
+            tags="Drame, Action",
+        )
+        MusicMasterpiece.objects.create(
+            user=self.user,
+            album_id="1",
+            album_name="album",
+            artist_id="1",
+            artist_name="artist",
+            image_url="url",
+            genders="Rock,Jazz",
+        )
+        self.create(movie_id=2, tags="Action")
+        Masterpiece.objects.filter(movie_id=2).update(tags="Comédie")
+        self.assertEqual(MasterpieceService.list(user=None, tag="Drame")[0].count(), 0)
+
+        out = io.StringIO()
+        call_command("reindex_tags", "--batch-size", "1", stdout=out)
+        self.assertIn("Masterpiece : 2 rows indexed", out.getvalue())
+        self.assertIn("MusicBaseModel : 1 rows indexed", out.getvalue())
+        masterpieces = MasterpieceService.list(user=None, tag="Action")[0]
+        self.assertEqual([masterpiece.movie_id for masterpiece in masterpieces], [1])
+        self.assertEqual(
+            MasterpieceService.list(user=None, tag="Comédie")[0].count(), 1
+        )
+        self.assertEqual(
+            set(
+                MusicMasterpiece.objects.get().tag_index.values_list("name", flat=True)
+            ),
+            {"Rock", "Jazz"},
+        )
+
+
+class CursorPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser")
+        for movie_id in range(25):
+            Vote.objects.create(
+                user=self.user,
+                movie_id=movie_id,
+                movie_name="movie name",
+                platform="movie",
+                value=4,
+            )
+        # Same created_at : ties broken by id
+        Vote.objects.filter(movie_id__lt=15).update(created_at=timezone.now())
+
+    def test_cursor_pages(self):
+        movie_ids = []
+        params = {"cursor": "", "page_size": 10}
+        while True:
+            # No count, one seek per page
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse("votes"), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("total", response.data)
+            movie_ids += [vote["movie_id"] for vote in response.data["data"]]
+            if response.data["is_last_page"]:
+                self.assertIsNone(response.data["next_cursor"])
+                break
+            params["cursor"] = response.data["next_cursor"]
+        self.assertEqual(len(movie_ids), 25)
+        self.assertEqual(set(movie_ids), set(range(25)))
+
+    def test_cursor_follows_filters(self):
+        response = self.client.get(
+            reverse("critics"), {"cursor": "", "user_id": self.user.id}
+        )
+        self.assertEqual(response.data["data"], [])
+        self.assertTrue(response.data["is_last_page"])
+
+    def test_invalid_cursor(self):
+        for cursor in ("nope", "bm9wZXxub3Bl"):
+            response = self.client.get(reverse("votes"), {"cursor": cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data, {"error": "Invalid cursor."})
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite FTS5")
+class CriticSearchTest(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(TMDBService, "denormalized_fields", return_value={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="testuser")
+        CriticService.create(
+            user=self.user,
+            content="Un polar nerveux, la poursuite finale est superbe",
+            movie_id="1",
+            movie_name="Heat",
+            platform="movie",
+            tags="Action",
+        )
+        CriticService.create(
+            user=self.user,
+            content="Moins bon que Heat, mais une belle ambiance",
+            movie_id="2",
+            movie_name="Collateral",
+            platform="movie",
+            tags="Thriller",
+        )
+        MusicCriticService.create(
+            user=self.user,
+            content="Un album éclatant, du début à la fin",
+            album_id="1",
+            album_name="Discovery",
+            artist_id="1",
+            artist_name="Daft Punk",
+            image_url="https://url.com",
+        )
+
+    def search(self, **params):
+        return self.client.get(reverse("critics_search"), params)
+
+    def test_titles_rank_first(self):
+        response = self.search(q="heat")
+        self.assertEqual(response.status_code, 200)
+        names = [item["critic"]["movie_name"] for item in response.data["data"]]
+        self.assertEqual(names, ["Heat", "Collateral"])
+        self.assertIn("<b>Heat</b>", response.data["data"][1]["snippet"])
+        self.assertIsNone(response.data["total"])
+
+    def test_snippet_escaped(self):
+        CriticService.create(
+            user=self.user,
+            content="<img src=x onerror=alert(1)> heat great",
+            movie_id="3",
+            movie_name="movie name",
+            platform="movie",
+            tags="",
+        )
+        response = self.search(q="great")
+        self.assertEqual(
+            response.data["data"][0]["snippet"],
+            "&lt;img src=x onerror=alert(1)&gt; heat <b>great</b>",
+        )
+
+    def test_diacritics_and_prefix(self):
+        response = self.search(q="ECLAT")
+        self.assertEqual(len(response.data["data"]), 1)
+        item = response.data["data"][0]
+        self.assertEqual(item["type"], "music")
+        self.assertEqual(item["critic"]["album_name"], "Discovery")
+        self.assertEqual(len(self.search(q="daft pu").data["data"]), 1)
+
+    def test_kind_filter(self):
+        self.assertEqual(len(self.search(q="fin").data["data"]), 2)
+        response = self.search(q="fin", type="music")
+        self.assertEqual([item["type"] for item in response.data["data"]], ["music"])
+        self.assertEqual(self.search(q="un", type="book").status_code, 400)
+
+    def test_invalid_queries(self):
+        self.assertEqual(self.search(q="  ").status_code, 400)
+        # FTS5 syntax is matched as plain words
+        response = self.search(q='heat" OR NEAR(')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["data"], [])
+
+    def test_pagination(self):
+        for movie_id in range(3, 25):
+            CriticService.create(
+                user=self.user,
+                content="Heat again",
+                movie_id=str(movie_id),
+                movie_name="movie name",
+                platform="movie",
+                tags="",
+            )
+        response = self.search(q="heat")
+        self.assertEqual((response.data["from"], response.data["to"]), (1, 20))
+        self.assertFalse(response.data["is_last_page"])
+        response = self.search(q="heat", page=2)
+        self.assertEqual((response.data["from"], response.data["to"]), (21, 24))
+        self.assertTrue(response.data["is_last_page"])
+
+    def test_delete_unindexes(self):
+        CriticService.delete(user=self.user, movie_id="1")
+        names = [
+            item["critic"]["movie_name"] for item in self.search(q="heat").data["data"]
+        ]
+        self.assertEqual(names, ["Collateral"])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM critic_search")
+        self.assertEqual(self.search(q="heat").data["data"], [])
+        call_command("rebuild_search_index", stdout=io.StringIO())
+        self.assertEqual(len(self.search(q="heat").data["data"]), 2)
+        self.assertEqual(len(self.search(q="daft").data["data"]), 1)
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite query plans")
+class ListQueryPlanTest(TestCase):
+    def assertIndexed(self, queryset, table):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf"(SCAN|SEARCH) {table} USING (COVERING )?INDEX")
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_list_services_use_indexes(self):
+        lists = {
+            "marcus_masterpiece": MasterpieceService.list,
+            "marcus_watchlist": WatchlistService.list,
+            "marcus_critic": CriticService.list,
+        }
+        for table, service in lists.items():
+            for user in (None, 1):
+                with self.subTest(table=table, user=user):
+                    self.assertIndexed(service(user=user, tag="Tous")[0], table)
+
+        for filters in ({"user": 1}, {"stars": 4}, {"movie_id": 1}, {}):
+            with self.subTest(table="marcus_vote", **filters):
+                votes, _ = VoteService.list(
+                    **{"user": None, "stars": None, "movie_id": None, "tag": None}
+                    | filters
+                )
+                self.assertIndexed(votes, "marcus_vote")
+
+    def test_tag_filters_use_indexes(self):
+        lists = {
+            "marcus_masterpiece": MasterpieceService.list(user=None, tag="Action"),
+            "marcus_watchlist": WatchlistService.list(user=None, tag="Action"),
+            "marcus_critic": CriticService.list(user=None, tag="Action"),
+            "marcus_vote": VoteService.list(
+                user=None, stars=None, movie_id=None, tag="Action"
+            ),
+        }
+        for table, (queryset, _) in lists.items():
+            with self.subTest(table=table):
+                plan = queryset.explain()
+                self.assertRegex(plan, r"SEARCH marcus_tag USING (COVERING )?INDEX")
+                self.assertRegex(plan, rf"SEARCH {table}_tag_index USING INDEX")
+                self.assertNotIn(f"SCAN {table}", plan)
+
+    def test_critics_by_movie_use_index(self):
+        critics = Critic.objects.filter(movie_id=1).order_by("-created_at")
+        self.assertIndexed(critics, "marcus_critic")
+
+
+class ExportJobTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        settings = override_settings(EXPORT_ROOT=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(username="testuser")
+        self.token = "Bearer {}".format(get_tokens_for_user(self.user).get("access"))
+        Critic.objects.create(
+            user=self.user,
+            movie_id=1,
+            movie_name="movie name",
+            platform="movie",
+            content="test critic",
+        )
+
+    def create(self, kind="movie_critics", token=None):
+        return self.client.post(
+            reverse("exports"),
+            {"kind": kind},
+            HTTP_AUTHORIZATION=token or self.token,
+        )
+
+    def work(self):
+        call_command("export_worker", "--once", stdout=io.StringIO())
+
+    def test_export_job(self):
+        # Queued, deduplicated while pending
+        response = self.create()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], "pending")
+        job_id = response.data["id"]
+        response = self.create()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], job_id)
+        self.assertEqual(self.create(kind="music_critics").status_code, 202)
+
+        download = reverse("export_download", args=[job_id])
+        response = self.client.get(download, HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, 404)
+
+        self.work()
+        response = self.client.get(
+            reverse("export_details", args=[job_id]), HTTP_AUTHORIZATION=self.token
+        )
+        self.assertEqual(response.data["status"], "done")
+        self.assertEqual(len(list(self.root.iterdir())), 2)
+        response = self.client.get(download, HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("mes_critiques_cinema.xlsx", response["Content-Disposition"])
+        document = b"".join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(document)) as archive:
+            sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+        self.assertIn("test critic", sheet)
+
+        # Done jobs are not reused
+        self.assertEqual(self.create().status_code, 202)
+
+    def test_jobs_are_private(self):
+        job_id = self.create().data["id"]
+        self.work()
+        other = User.objects.create_user(username="otheruser")
+        token = "Bearer {}".format(get_tokens_for_user(other).get("access"))
+        for name in ("export_details", "export_download"):
+            response = self.client.get(
+                reverse(name, args=[job_id]), HTTP_AUTHORIZATION=token
+            )
+            self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse("export_details", args=[job_id]))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.create(kind="book", token=token).status_code, 400)
+
+    def test_failed_job(self):
+        job_id = self.create().data["id"]
+        with mock.patch.object(CriticService, "export", side_effect=OSError("Full")):
+            self.work()
+        job = ExportJob.objects.get(pk=job_id)
+        self.assertEqual((job.status, job.error), ("failed", "Full"))
+        self.assertEqual(list(self.root.iterdir()), [])
+
+    def test_expire(self):
+        job_id = self.create().data["id"]
+        self.work()
+        stale = timezone.now() - timedelta(days=2)
+        for path in self.root.iterdir():
+            os.utime(path, (stale.timestamp(), stale.timestamp()))
+        ExportJob.objects.filter(pk=job_id).update(finished_at=stale)
+        running = ExportJob.objects.create(
+            user=self.user, kind="music_critics", status="running", started_at=stale
+        )
+
+        self.work()
+        self.assertEqual(ExportJob.objects.get(pk=job_id).status, "expired")
+        self.assertEqual(list(self.root.iterdir()), [])
+        self.assertEqual(ExportJob.objects.get(pk=running.pk).status, "failed")
+        response = self.client.get(
+            reverse("export_download", args=[job_id]), HTTP_AUTHORIZATION=self.token
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_expire_only_job_files(self):
+        stale = timezone.now() - timedelta(days=2)
+        orphans = [
+            self.root / f"{uuid.uuid4()}.xlsx",
+            self.root / f"{uuid.uuid4()}.xlsx.part",
+        ]
+        others = [self.root / "notes.txt", self.root / "report.xlsx"]
+        for path in orphans + others:
+            path.write_bytes(b"")
+        (self.root / f"{uuid.uuid4()}.xlsx").mkdir()
+        for path in self.root.iterdir():
+            os.utime(path, (stale.timestamp(), stale.timestamp()))
+        fresh = self.root / f"{uuid.uuid4()}.xlsx.part"
+        fresh.write_bytes(b"")
+
+        self.work()
+        self.assertFalse(any(path.exists() for path in orphans))
+        self.assertTrue(all(path.exists() for path in others + [fresh]))
+        self.assertEqual(len(list(self.root.iterdir())), 4)
+
+
+class TMDBCacheTest(TestCase):
+    def setUp(self):
+        TMDBService._breaker.reset()
+        self.payload = {"release_date": "2023-07-19", "poster_path": "/poster.jpg"}
+
+    def test_cache_hit(self):
+        with mock.patch.object(
+            TMDBService, "fetch", return_value=self.payload
+        ) as fetch:
+            self.assertEqual(TMDBService.movie_details(872585), self.payload)
+            self.assertEqual(TMDBService.movie_details(872585), self.payload)
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(TMDBCache.objects.count(), 1)
+
+    def test_cache_stale_and_expired(self):
+        TMDBService.store(
+            platform="movie", movie_id=1, language="fr", payload=self.payload
+        )
+        # Stale : served from cache, refreshed in background
+        TMDBCache.objects.update(fetched_at=timezone.now() - timedelta(days=2))
+        with mock.patch.object(TMDBService, "fetch") as fetch, mock.patch.object(
+            TMDBService, "revalidate"
+        ) as revalidate:
+            self.assertEqual(TMDBService.movie_details(1), self.payload)
+        self.assertEqual(fetch.call_count, 0)
+        self.assertEqual(revalidate.call_count, 1)
+
+        # Expired : fetched synchronously
+        TMDBCache.objects.update(fetched_at=timezone.now() - timedelta(days=30))
+        with mock.patch.object(
+            TMDBService, "fetch", return_value={"poster_path": "/new.jpg"}
+        ) as fetch:
+            self.assertEqual(TMDBService.movie_details(1), {"poster_path": "/new.jpg"})
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(TMDBCache.objects.get().payload, {"poster_path": "/new.jpg"})
+
+
+class TMDBPrefetchTest(TestCase):
+    def setUp(self):
+        TMDBService._breaker.reset()
+        self.user = User.objects.create_user(username="testuser")
+        # TMDB unavailable at creation : details are not denormalized
+        with mock.patch.object(TMDBService, "fetch", side_effect=ConnectionError):
+            for movie_id in (1, 2, 3):
+                MasterpieceService.create(
+                    user=self.user,
+                    movie_id=movie_id,
+                    movie_name="movie name",
+                    platform="movie",
+                    tags="Action",
+                )
+
+    def test_prefetch_page(self):
+        payload = {
+            "release_date": "2023-07-19",
+            "poster_path": "/poster.jpg",
+            "overview": "synopsis",
+            "backdrop_path": "/backdrop.jpg",
+        }
+        TMDBService.store(platform="movie", movie_id=1, language="fr", payload=payload)
+        with mock.patch.object(TMDBService, "fetch", return_value=payload) as fetch:
+            response = self.client.get(reverse("masterpieces"))
+        self.assertEqual(response.status_code, 200)
+        # Only the two cache misses reach TMDB, once each
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(
+            sorted(call.kwargs["movie_id"] for call in fetch.call_args_list), [2, 3]
+        )
+        for row in response.json().get("data"):
+            self.assertEqual(row["movie_details"]["poster_path"], "/poster.jpg")
+        self.assertEqual(TMDBCache.objects.count(), 3)
+
+
+class DenormalizedDetailsTest(TestCase):
+    def setUp(self):
+        TMDBService._breaker.reset()
+        self.user = User.objects.create_user(username="testuser")
+        self.payload = {
+            "first_air_date": "2008-01-20",
+            "poster_path": "/poster.jpg",
+            "overview": "synopsis",
+            "backdrop_path": "/backdrop.jpg",
+            "created_by": [{"name": "Vince Gilligan"}],
+        }
+
+    def test_details_captured_at_creation(self):
+        with mock.patch.object(TMDBService, "fetch", return_value=self.payload):
+            MasterpieceService.create(
+                user=self.user,
+                movie_id=1396,
+                movie_name="Breaking Bad",
+                platform="tv",
+                tags="Drame",
+            )
+        masterpiece = Masterpiece.objects.get()
+        self.assertEqual(masterpiece.released_date, "2008-01-20")
+        self.assertEqual(masterpiece.director, "Vince Gilligan")
+
+        with mock.patch.object(TMDBService, "fetch") as fetch:
+            response = self.client.get(reverse("masterpieces"))
+        self.assertEqual(fetch.call_count, 0)
+        self.assertEqual(
+            response.json().get("data")[0]["movie_details"],
+            {
+                "released_date": "2008-01-20",
+                "poster_path": "/poster.jpg",
+                "synopsis": "synopsis",
+                "backdrop_path": "/backdrop.jpg",
+                "director": "Vince Gilligan",
+            },
+        )
+
+    def test_refresh_movie_details_command(self):
+        with mock.patch.object(TMDBService, "fetch", side_effect=ConnectionError):
+            VoteService.create(
+                user=self.user,
+                movie_id=1396,
+                movie_name="Breaking Bad",
+                value=5,
+                platform="tv",
+                tags="Drame",
+            )
+        self.assertIsNone(Vote.objects.get().details_updated_at)
+
+        with mock.patch.object(TMDBService, "fetch", return_value=self.payload):
+            call_command("refresh_movie_details", stdout=io.StringIO())
+        vote = Vote.objects.get()
+        self.assertEqual(vote.poster_path, "/poster.jpg")
+        self.assertIsNotNone(vote.details_updated_at)
+
+
+class TMDBSingleFlightTest(TestCase):
+    def setUp(self):
+        TMDBService._breaker.reset()
+        cache.clear()
+        self.payload = {"release_date": "2023-07-19", "poster_path": "/poster.jpg"}
+
+    def test_concurrent_fetches_are_coalesced(self):
+        def slow_fetch(**kwargs):
+            time.sleep(0.2)
+            return self.payload
+
+        results = []
+        with mock.patch.object(TMDBService, "fetch", side_effect=slow_fetch) as fetch:
+            threads = [
+                threading.Thread(
+                    target=lambda: results.append(
+                        TMDBService.fetch_shared(
+                            platform="movie", movie_id=1, language="fr"
+                        )
+                    )
+                )
+                for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(results, [self.payload] * 5)
+
+    def test_title_locked_by_another_worker(self):
+        TMDBService.lock(platform="movie", movie_id=1, language="fr")
+
+        # The other worker stores the title while we wait
+        def other_worker_stores(seconds):
+            TMDBService.store(
+                platform="movie", movie_id=1, language="fr", payload=self.payload
+            )
+
+        with mock.patch.object(TMDBService, "fetch") as fetch, mock.patch(
+            "marcus.services.time.sleep", side_effect=other_worker_stores
+        ):
+            self.assertEqual(TMDBService.movie_details(1), self.payload)
+        self.assertEqual(fetch.call_count, 0)
+
+    @override_settings(TMDB_LOCK_TIMEOUT=0.1)
+    def test_lock_timeout_falls_back_to_fetch(self):
+        TMDBService.lock(platform="movie", movie_id=1, language="fr")
+        with mock.patch.object(
+            TMDBService, "fetch", return_value=self.payload
+        ) as fetch:
+            self.assertEqual(TMDBService.movie_details(1), self.payload)
+        self.assertEqual(fetch.call_count, 1)
+
+
+class TMDBExecutorTest(TestCase):
+    def setUp(self):
+        TMDBService._breaker.reset()
+        cache.clear()
+        self.keys = {("movie", movie_id) for movie_id in range(20)}
+        self.running = 0
+        self.most_running = 0
+        self.lock = threading.Lock()
+
+    def slow_fetch(self, **kwargs):
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(0.1)
+        with self.lock:
+            self.running -= 1
+        return {"poster_path": "/poster.jpg"}
+
+    def drain(self):
+        # Wait for the process-wide pool to run what is left
+        TMDBService._executor.submit(lambda: None).result()
+        time.sleep(0.2)
+
+    def test_bounded_per_process(self):
+        with mock.patch.object(
+            TMDBService, "fetch", side_effect=self.slow_fetch
+        ), mock.patch.object(TMDBService, "store"):
+            requests = [
+                threading.Thread(
+                    target=TMDBService.fetch_many,
+                    kwargs={"keys": self.keys, "language": "fr"},
+                )
+                for _ in range(2)
+            ]
+            for request in requests:
+                request.start()
+            for request in requests:
+                request.join()
+        self.assertLessEqual(self.most_running, TMDBService._executor._max_workers)
+
+    def test_queued_fetches_cancelled_at_deadline(self):
+        with mock.patch.object(
+            TMDBService, "fetch", side_effect=self.slow_fetch
+        ) as fetch, mock.patch.object(TMDBService, "store"):
+            details = TMDBService.fetch_many(
+                keys=self.keys, language="fr", deadline=time.monotonic() + 0.05
+            )
+            self.drain()
+        self.assertEqual(details, {})
+        # Only the fetches started before the deadline reached TMDB
+        self.assertLessEqual(fetch.call_count, TMDBService._executor._max_workers)
+
+    def test_revalidate_on_pool(self):
+        with mock.patch.object(
+            TMDBService, "fetch", side_effect=self.slow_fetch
+        ), mock.patch.object(TMDBService, "store") as store, mock.patch(
+            "marcus.services.threading.Thread"
+        ) as thread:
+            for _ in range(3):
+                TMDBService.revalidate(platform="movie", movie_id=1, language="fr")
+            self.drain()
+        thread.assert_not_called()
+        self.assertEqual(store.call_count, 1)
+        self.assertEqual(
+            store.call_args.kwargs["payload"], {"poster_path": "/poster.jpg"}
+        )
+
+
+class TMDBStandinTest(TestCase):
+    def setUp(self):
+        self.standin = TMDBStandinServer(strict=True).start()
+
+    def tearDown(self):
+        self.standin.stop()
+
+    def test_fetch_from_standin(self):
+        with override_settings(TMDB_BASE_URL=self.standin.url):
+            response = TMDBService.fetch(platform="tv", movie_id=1396, language="fr")
+            self.assertEqual(response["released_date"], "2008-01-20")
+            self.assertEqual(response["director"], "Vince Gilligan")
+            with self.assertRaises(Exception):
+                TMDBService.fetch(platform="movie", movie_id=1, language="fr")
+
+        self.standin.error_rate = 1
+        with override_settings(TMDB_BASE_URL=self.standin.url):
+            with self.assertRaises(Exception):
+                TMDBService.fetch(platform="tv", movie_id=1396, language="fr")
+
+
+class TMDBDegradedTest(TestCase):
+    def setUp(self):
+        TMDBService._breaker.reset()
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser")
+        with mock.patch.object(TMDBService, "fetch", side_effect=ConnectionError):
+            for movie_id in (1, 2):
+                MasterpieceService.create(
+                    user=self.user,
+                    movie_id=movie_id,
+                    movie_name="movie name",
+                    platform="movie",
+                    tags="Action",
+                )
+        TMDBService._breaker.reset()
+
+    def test_circuit_breaker(self):
+        with mock.patch.object(
+            TMDBService, "fetch", side_effect=requests.ConnectionError
+        ) as fetch:
+            for _ in range(TMDBService._breaker.threshold):
+                with self.assertRaises(requests.ConnectionError):
+                    TMDBService.fetch_shared(
+                        platform="movie", movie_id=1, language="fr"
+                    )
+            with self.assertRaises(TMDBUnavailable):
+                TMDBService.fetch_shared(platform="movie", movie_id=1, language="fr")
+        self.assertEqual(fetch.call_count, TMDBService._breaker.threshold)
+        self.assertEqual(TMDBService._breaker.state, "open")
+
+        # Unknown titles are not outages
+        TMDBService._breaker.reset()
+        not_found = requests.HTTPError(response=mock.Mock(status_code=404))
+        with mock.patch.object(TMDBService, "fetch", side_effect=not_found):
+            for _ in range(TMDBService._breaker.threshold):
+                with self.assertRaises(requests.HTTPError):
+                    TMDBService.fetch_shared(
+                        platform="movie", movie_id=1, language="fr"
+                    )
+        self.assertEqual(TMDBService._breaker.state, "closed")
+
+    def test_degraded_list(self):
+        TMDBService.store(
+            platform="movie",
+            movie_id=1,
+            language="fr",
+            payload={"release_date": "2023-07-19", "poster_path": "/poster.jpg"},
+        )
+        TMDBCache.objects.update(fetched_at=timezone.now() - timedelta(days=30))
+        with mock.patch.object(
+            TMDBService, "fetch", side_effect=requests.ConnectionError
+        ):
+            response = self.client.get(reverse("masterpieces"))
+        self.assertEqual(response.status_code, 200)
+        details = {
+            row["movie_id"]: row["movie_details"] for row in response.json()["data"]
+        }
+        self.assertEqual(details[1]["poster_path"], "/poster.jpg")
+        self.assertTrue(details[1]["degraded"])
+        self.assertEqual(details[2], {"degraded": True})
+
+    @override_settings(TMDB_LATENCY_BUDGET=0.1)
+    def test_latency_budget(self):
+        def slow_fetch(**kwargs):
+            time.sleep(0.5)
+            raise requests.ConnectionError
+
+        with mock.patch.object(TMDBService, "fetch", side_effect=slow_fetch):
+            started = time.monotonic()
+            response = self.client.get(reverse("masterpieces"))
+            elapsed = time.monotonic() - started
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(elapsed, 0.4)
+        for row in response.json()["data"]:
+            self.assertEqual(row["movie_details"], {"degraded": True})
+
+
+class WarmTMDBCacheTest(TestCase):
+    def setUp(self):
+        TMDBService._breaker.reset()
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser")
+        self.other_user = User.objects.create_user(username="otheruser")
+        Masterpiece.objects.create(
+            user=self.user, movie_id=1, movie_name="one", platform="movie"
+        )
+        Watchlist.objects.create(
+            user=self.other_user, movie_id=1, movie_name="one", platform="movie"
+        )
+        Vote.objects.create(
+            user=self.user, movie_id=2, movie_name="two", platform="tv", value=3
+        )
+        Critic.objects.create(
+            user=self.user, movie_id=3, movie_name="three", platform="movie"
+        )
+
+    def test_warm_most_recent_first(self):
+        # Title 1 is the most popular, but was last active yesterday
+        yesterday = timezone.now() - timedelta(days=1)
+        Masterpiece.objects.update(created_at=yesterday)
+        Watchlist.objects.update(created_at=yesterday)
+        with mock.patch.object(TMDBService, "fetch", return_value={}):
+            call_command("warm_tmdb_cache", limit=1, stdout=io.StringIO())
+        self.assertEqual(
+            list(TMDBCache.objects.values_list("platform", "movie_id")),
+            [("movie", 3)],
+        )
+
+        with mock.patch.object(TMDBService, "fetch", return_value={}) as fetch:
+            call_command("warm_tmdb_cache", rate=1000, stdout=io.StringIO())
+        # Title 3 is already fresh, title 1 is fetched once for both rows
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(TMDBCache.objects.count(), 3)
+
+    def test_warm_most_popular_first_within_a_day(self):
+        # Title 1 (2 rows) before title 3, a one-off created after it
+        with mock.patch.object(TMDBService, "fetch", return_value={}) as fetch:
+            call_command(
+                "warm_tmdb_cache", batch_size=1, rate=1000, stdout=io.StringIO()
+            )
+        self.assertEqual(
+            [call.kwargs["movie_id"] for call in fetch.call_args_list], [1, 3, 2]
+        )
+
+
+class TMDBSessionTest(TestCase):
+    def setUp(self):
+        TMDBService._breaker.reset()
+        TMDBService._session = None
+        self.standin = TMDBStandinServer().start()
+
+    def tearDown(self):
+        self.standin.stop()
+        TMDBService._session = None
+
+    def test_connection_reuse(self):
+        with override_settings(TMDB_BASE_URL=self.standin.url):
+            for movie_id in range(1, 6):
+                TMDBService.fetch(platform="movie", movie_id=movie_id, language="fr")
+        stats = TMDBService.stats()
+        self.assertEqual(stats["requests"], 5)
+        self.assertEqual(stats["connections"], 1)
+        self.assertEqual(stats["connection_reuse_rate"], 0.8)
+
+    @override_settings(TMDB_RETRIES=2, TMDB_RETRY_BACKOFF=0.01)
+    def test_retry_with_backoff(self):
+        self.standin.error_rate = 1
+        with override_settings(TMDB_BASE_URL=self.standin.url):
+            with self.assertRaises(requests.HTTPError):
+                TMDBService.fetch(platform="movie", movie_id=1, language="fr")
+        self.assertEqual(TMDBService.stats()["requests"], 3)
+
+    def test_stats_view(self):
+        admin = User.objects.create_superuser(username="admin", password="password")
+        token = "Bearer {}".format(get_tokens_for_user(admin).get("access"))
+        response = self.client.get(reverse("tmdb_stats"))
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get(reverse("tmdb_stats"), HTTP_AUTHORIZATION=token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["circuit_breaker"], "closed")
+
+
+class MovieDetailsBatchTest(TestCase):
+    def setUp(self):
+        TMDBService._breaker.reset()
+        cache.clear()
+        self.url = reverse("movie_details")
+        self.payload = {
+            "release_date": "2023-07-19",
+            "first_air_date": "2008-01-20",
+            "poster_path": "/poster.jpg",
+            "overview": "synopsis",
+            "backdrop_path": "/backdrop.jpg",
+        }
+
+    def test_batch_details(self):
+        with mock.patch.object(
+            TMDBService, "fetch", return_value=self.payload
+        ) as fetch:
+            response = self.client.get(self.url + "?ids=movie:1,tv:2,movie:1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(fetch.call_count, 2)
+        data = response.json()["data"]
+        self.assertEqual(data["movie:1"]["released_date"], "2023-07-19")
+        self.assertEqual(data["tv:2"]["released_date"], "2008-01-20")
+
+        response = self.client.get(self.url + "?ids=book:1")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url + "?ids=movie:abc")
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_without_details(self):
+        user = User.objects.create_user(username="testuser")
+        Watchlist.objects.create(
+            user=user, movie_id=1, movie_name="one", platform="movie"
+        )
+        with mock.patch.object(TMDBService, "fetch") as fetch:
+            response = self.client.get(reverse("watchlists") + "?details=none")
+        self.assertEqual(fetch.call_count, 0)
+        self.assertNotIn("movie_details", response.json()["data"][0])
+
+
+class RateLimiterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_token_bucket(self):
+        limiter = RateLimiter(rate=20, burst=2, max_wait=0, key="test:rate")
+        limiter.acquire()
+        limiter.acquire()
+        with self.assertRaises(TMDBThrottled):
+            limiter.acquire()
+        self.assertEqual(limiter.rejected, 1)
+
+        # Queued until a token is refilled (1 / 20 s)
+        limiter.max_wait = 1
+        started = time.monotonic()
+        limiter.acquire()
+        self.assertGreater(time.monotonic() - started, 0.03)
+        self.assertEqual(limiter.throttled, 1)
+
+    def test_shared_window(self):
+        # Other workers already used this second's budget
+        limiter = RateLimiter(rate=5, burst=5, max_wait=0, key="test:rate")
+        cache.set(f"test:rate:{int(time.time())}", 5, timeout=2)
+        with self.assertRaises(TMDBThrottled):
+            limiter.acquire()
+
+    def test_cache_outside_lock(self):
+        limiter = RateLimiter(rate=5, burst=5, max_wait=0, key="test:rate")
+        locked = []
+
+        def spy(method):
+            def call(*args, **kwargs):
+                locked.append(limiter.lock.locked())
+                return method(*args, **kwargs)
+
+            return call
+
+        with mock.patch.object(cache, "get", spy(cache.get)), mock.patch.object(
+            cache, "incr", spy(cache.incr)
+        ), mock.patch.object(cache, "add", spy(cache.add)):
+            limiter.acquire()
+            cache.set(f"test:rate:{int(time.time())}", 5, timeout=2)
+            with self.assertRaises(TMDBThrottled):
+                limiter.acquire()
+        self.assertTrue(locked)
+        self.assertFalse(any(locked))
+        # Shed call : its token is given back
+        self.assertGreater(limiter.tokens, 3.9)
+
+    def test_retry_after(self):
+        TMDBService._breaker.reset()
+        limiter = RateLimiter(rate=20, burst=5, max_wait=0, key="test:rate")
+        too_many_requests = requests.HTTPError(
+            response=mock.Mock(status_code=429, headers={"Retry-After": "30"})
+        )
+        with mock.patch.object(TMDBService, "_limiter", limiter), mock.patch.object(
+            TMDBService, "fetch", side_effect=too_many_requests
+        ) as fetch:
+            with self.assertRaises(requests.HTTPError):
+                TMDBService.fetch_shared(platform="movie", movie_id=1, language="fr")
+            with self.assertRaises(TMDBThrottled):
+                TMDBService.fetch_shared(platform="movie", movie_id=1, language="fr")
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(limiter.rate_limited, 1)
+        self.assertEqual(limiter.rejected, 1)
+        self.assertEqual(TMDBService._breaker.state, "closed")
+
+
+class TMDBProjectionTest(TestCase):
+    def setUp(self):
+        TMDBService._breaker.reset()
+        TMDBService._session = None
+        cache.clear()
+        self.standin = TMDBStandinServer(strict=True).start()
+
+    def tearDown(self):
+        self.standin.stop()
+        TMDBService._session = None
+
+    def test_movie_director_in_one_call(self):
+        with override_settings(TMDB_BASE_URL=self.standin.url):
+            details = TMDBService.movie_details(872585)
+        self.assertEqual(TMDBService.stats()["requests"], 1)
+        self.assertEqual(
+            details,
+            {
+                "released_date": "2023-07-19",
+                "poster_path": "/boAUuJBeID7VNp4L7LNMQs8mfQS.jpg",
+                "synopsis": details["synopsis"],
+                "backdrop_path": "/fm6KqXpk3M2HVveHwCrBSSBaO0V.jpg",
+                "director": "Christopher Nolan",
+            },
+        )
+        # Only the projection is cached
+        self.assertEqual(TMDBCache.objects.get().payload, details)
+
+    def test_raw_payload_cached_before_projection(self):
+        raw = {"first_air_date": "2008-01-20", "overview": "synopsis"}
+        self.assertEqual(
+            TMDBService.project(platform="tv", response=raw),
+            TMDBService.project(
+                platform="tv", response=TMDBService.project(platform="tv", response=raw)
+            ),
+        )
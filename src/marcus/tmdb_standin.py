@@ -0,0 +1,110 @@
+"""
+Local stand-in for the TMDB movie & tv details API (benchmarks, offline development)
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURE = Path(__file__).resolve().parent / "tmdb_standin.json"
+DETAILS_PATH = re.compile(r"^/3/(movie|tv)/(\d+)$")
+APPENDABLE = ("credits",)
+
+
+class TMDBStandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        time.sleep(self.server.latency + random.uniform(0, self.server.jitter))
+
+        if random.random() < self.server.error_rate:
+            return self.send_json(
+                503,
+                {
+                    "status_code": 11,
+                    "status_message": "Internal error: Something went wrong, contact TMDb.",
+                },
+            )
+
+        match = DETAILS_PATH.match(url.path)
+        payload = match and self.server.details(match[1], int(match[2]))
+        if not payload:
+            return self.send_json(
+                404,
+                {
+                    "status_code": 34,
+                    "status_message": "The resource you requested could not be found.",
+                },
+            )
+
+        append = parse_qs(url.query).get("append_to_response", [""])[0].split(",")
+        payload = {
+            key: value
+            for key, value in payload.items()
+            if key not in APPENDABLE or key in append
+        }
+        self.send_json(200, payload)
+
+    def send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TMDBStandinServer(ThreadingHTTPServer):
+    """
+    Serves fixture titles with artificial latency (ms) and error rate (0 to 1).
+    Unknown ids get a copy of the first fixture title unless strict.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        *,
+        fixture: Path = FIXTURE,
+        latency: int = 0,
+        jitter: int = 0,
+        error_rate: float = 0,
+        strict: bool = False,
+    ):
+        super().__init__(address, TMDBStandinHandler)
+        with open(fixture, encoding="utf-8") as file:
+            self.fixture = json.load(file)
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.error_rate = error_rate
+        self.strict = strict
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def details(self, platform: str, movie_id: int):
+        titles = self.fixture.get(platform, {})
+        payload = titles.get(str(movie_id))
+        if payload is None and not self.strict and titles:
+            payload = {**next(iter(titles.values())), "id": movie_id}
+        return payload
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
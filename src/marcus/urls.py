@@ -9,11 +9,26 @@ urlpatterns = [
     path("register", views.RegisterView.as_view(), name="register"),
     path("token/", MyTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
-    path("users", views.Users.as_view()),
-    path("users/<int:user_id>", views.UserDetails.as_view()),
+    path("users", views.Users.as_view(), name="users"),
+    path("users/<int:user_id>", views.UserDetails.as_view(), name="user_details"),
     path("masterpieces", views.MasterpiecesView.as_view(), name="masterpieces"),
     path("watchlists", views.WatchlistsView.as_view(), name="watchlists"),
     path("votes", views.VotesView.as_view(), name="votes"),
     path("critics", views.CriticsView.as_view(), name="critics"),
     path("critics/export", views.CriticsExportView.as_view(), name="critics_export"),
+    path("critics/search", views.CriticsSearchView.as_view(), name="critics_search"),
+    path("exports", views.ExportsView.as_view(), name="exports"),
+    path(
+        "exports/<uuid:job_id>",
+        views.ExportDetailsView.as_view(),
+        name="export_details",
+    ),
+    path(
+        "exports/<uuid:job_id>/download",
+        views.ExportDownloadView.as_view(),
+        name="export_download",
+    ),
+    path("movies/details", views.MovieDetailsView.as_view(), name="movie_details"),
+    path("movies/ratings", views.MovieRatingsView.as_view(), name="movie_ratings"),
+    path("tmdb/stats", views.TMDBStatsView.as_view(), name="tmdb_stats"),
 ]
@@ -1,17 +1,27 @@
 from rest_framework.response import Response
 from rest_framework.decorators import permission_classes
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.permissions import (
+    IsAdminUser,
+    IsAuthenticatedOrReadOnly,
+    IsAuthenticated,
+)
 from rest_framework.views import APIView
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from django.http import FileResponse
+from django.conf import settings
 
 
 # , movie_details, movie_search
 from .services import (
     CriticService,
+    ExportService,
     MasterpieceService,
+    RatingService,
+    SearchService,
+    TMDBService,
     ToolkitService,
+    UserService,
     VoteService,
     WatchlistService,
 )
@@ -28,7 +38,11 @@ from .serializers import (
     CreateWatchlistSerializer,
     MasterpieceSerializer,
     CreateMasterpieceSerializer,
+    MovieRatingSerializer,
+    ExportJobSerializer,
+    CreateExportJobSerializer,
 )
+from marcus_music.serializers import CriticSerializer as MusicCriticSerializer
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 
@@ -66,14 +80,34 @@ class MyTokenObtainPairView(TokenObtainPairView):
 
 class Users(APIView):
     def get(self, request):
-        users = User.objects.all()
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        search_param = request.query_params.get("search")
+        page_param = request.query_params.get("page")
+        # Service
+        users, range = UserService.list(search=search_param, page=page_param)
+        # Without page : every user, as a plain list
+        if range is None:
+            serializer = UserSerializer(users, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        # Paginate
+        page, has_next, start_index, end_index, total_objects = ToolkitService.paginate(
+            page_number=page_param, range=range, objects=users
+        )
+        # Serialize
+        serializer = UserSerializer(page, many=True)
+        # Response
+        response = {
+            "total": total_objects,
+            "from": start_index,
+            "to": end_index,
+            "is_last_page": not has_next,
+            "data": serializer.data,
+        }
+        return Response(response, status=status.HTTP_200_OK)
 
 
 class UserDetails(APIView):
     def get(self, request, user_id):
-        user = get_object_or_404(User, id=user_id)
+        user = get_object_or_404(UserService.with_stats(), id=user_id)
         serializer = UserSerializer(user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -82,11 +116,11 @@ class BaseView(APIView):
     service = None
     retrieve_serializer = None
     create_serializer = None
+    prefetch_movie_details = False
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get(self, request):
         user_param = request.query_params.get("user_id")
-        page_param = request.query_params.get("page")
         gender_tag_param = request.query_params.get("tag")
         # Sanity check
         if user_param:
@@ -96,19 +130,29 @@ class BaseView(APIView):
                 return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         # Services (list & paginate)
         objects, range = self.service.list(user=user_param, tag=gender_tag_param)
-        page, has_next, start_index, end_index, total_objects = ToolkitService.paginate(
-            page_number=page_param, range=range, objects=objects
+        range = ToolkitService.page_size(
+            value=request.query_params.get("page_size"), default=range
+        )
+        page, pagination = ToolkitService.page(
+            params=request.query_params, range=range, objects=objects
         )
+        # TMDB details of rows not denormalized yet (parallel)
+        context = {"details": request.query_params.get("details")}
+        if self.prefetch_movie_details and context["details"] != "none":
+            details, degraded = TMDBService.prefetch(
+                keys=[
+                    (obj.platform, obj.movie_id)
+                    for obj in page
+                    if obj.details_updated_at is None
+                ],
+                budget=getattr(settings, "TMDB_LATENCY_BUDGET", 1.5),
+            )
+            context["movie_details"] = details
+            context["degraded_movie_details"] = degraded
         # Serialize
-        serialized_data = self.retrieve_serializer(page, many=True)
+        serialized_data = self.retrieve_serializer(page, many=True, context=context)
         # Response
-        response = {
-            "total": total_objects,
-            "from": start_index,
-            "to": end_index,
-            "is_last_page": not has_next,
-            "data": serialized_data.data,
-        }
+        response = {**pagination, "data": serialized_data.data}
         return Response(response, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -145,12 +189,14 @@ class MasterpiecesView(BaseView):
     service = MasterpieceService
     retrieve_serializer = MasterpieceSerializer
     create_serializer = CreateMasterpieceSerializer
+    prefetch_movie_details = True
 
 
 class WatchlistsView(BaseView):
     service = WatchlistService
     retrieve_serializer = WatchlistSerializer
     create_serializer = CreateWatchlistSerializer
+    prefetch_movie_details = True
 
 
 class VotesView(BaseView):
@@ -160,7 +206,6 @@ class VotesView(BaseView):
 
     def get(self, request):
         user_param = request.query_params.get("user_id")
-        page_param = request.query_params.get("page")
         stars_param = request.query_params.get("stars")
         movie_param = request.query_params.get("movie_id")
         gender_tag_param = request.query_params.get("tag")
@@ -178,19 +223,16 @@ class VotesView(BaseView):
             movie_id=movie_param,
             tag=gender_tag_param,
         )
-        page, has_next, start_index, end_index, total_objects = ToolkitService.paginate(
-            page_number=page_param, range=range, objects=objects
+        range = ToolkitService.page_size(
+            value=request.query_params.get("page_size"), default=range
+        )
+        page, pagination = ToolkitService.page(
+            params=request.query_params, range=range, objects=objects
         )
         # Serialize
         serialized_data = self.retrieve_serializer(page, many=True)
         # Response
-        response = {
-            "total": total_objects,
-            "from": start_index,
-            "to": end_index,
-            "is_last_page": not has_next,
-            "data": serialized_data.data,
-        }
+        response = {**pagination, "data": serialized_data.data}
         return Response(response, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -242,6 +284,54 @@ class CriticsExportView(BaseView):
         )
 
 
+class ExportsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        payload = request.data
+        # Serialize
+        serialized_data = CreateExportJobSerializer(data=payload)
+        # Validate
+        if not serialized_data.is_valid():
+            return Response(
+                {"error": serialized_data.errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+        # Service (run by the export_worker command)
+        job, created = ExportService.create(user=request.user, kind=payload["kind"])
+        # Response
+        return Response(
+            ExportJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK,
+        )
+
+
+class ExportDetailsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = ExportService.get(user=request.user, id=job_id)
+        if job is None:
+            return Response(
+                {"error": "Export not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(ExportJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+class ExportDownloadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = ExportService.get(user=request.user, id=job_id)
+        file = ExportService.download(job=job) if job else None
+        if file is None:
+            return Response(
+                {"error": "Export not found or not ready."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        document, filename = file
+        return FileResponse(document, as_attachment=True, filename=filename)
+
+
 class CriticsView(BaseView):
     service = CriticService
 
@@ -249,37 +339,37 @@ class CriticsView(BaseView):
         user_param = request.query_params.get("user_id")
         movie_param = request.query_params.get("movie_id")
         gender_tag_param = request.query_params.get("tag")
-        page_param = request.query_params.get("page")
         # Sanity check
         if user_param:
             try:
                 int(user_param)
             except ValueError as e:
                 return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if movie_param:
+            try:
+                int(movie_param)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         # Service
         if movie_param:
-            objects = CriticService.list_by_movie_id_and_aggregate_votes(
+            critics, range = CriticService.list_by_movie_id_and_aggregate_votes(
                 movie=movie_param
             )
-            count = None
-            # Serialize
-            serialized_data = CriticVoteSerializer(objects, many=True)
+            serializer = CriticVoteSerializer
         else:
             critics, range = CriticService.list(user=user_param, tag=gender_tag_param)
-            # Paginate
-            page, has_next, start_index, end_index, count = ToolkitService.paginate(
-                page_number=page_param, range=range, objects=critics
-            )
-            # Serialize
-            serialized_data = CriticSerializer(page, many=True)
+            serializer = CriticSerializer
+        range = ToolkitService.page_size(
+            value=request.query_params.get("page_size"), default=range
+        )
+        # Paginate
+        page, pagination = ToolkitService.page(
+            params=request.query_params, range=range, objects=critics
+        )
+        # Serialize
+        serialized_data = serializer(page, many=True)
         # Response
-        response = {}
-        if not movie_param:
-            response["total"] = count
-            response["from"] = start_index
-            response["to"] = end_index
-            response["is_last_page"] = not has_next
-        response["data"] = serialized_data.data
+        response = {**pagination, "data": serialized_data.data}
         return Response(response, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -304,6 +394,96 @@ class CriticsView(BaseView):
         return Response(data, status=status_code)
 
 
+class CriticsSearchView(APIView):
+    def get(self, request):
+        query_param = request.query_params.get("q", "")
+        type_param = request.query_params.get("type")
+        page_param = request.query_params.get("page")
+        # Sanity check
+        if type_param not in (None, "movie", "music"):
+            return Response(
+                {"error": "type must be movie or music."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # Service
+        try:
+            results, has_next, start_index, end_index = SearchService.search(
+                query=query_param, kind=type_param, page_number=page_param
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Serialize
+        data = []
+        for kind, critic, snippet in results:
+            serializer = CriticSerializer if kind == "movie" else MusicCriticSerializer
+            data.append(
+                {"type": kind, "snippet": snippet, "critic": serializer(critic).data}
+            )
+        # Response (no count, as ?total=none)
+        response = {
+            "total": None,
+            "from": start_index,
+            "to": end_index,
+            "is_last_page": not has_next,
+            "data": data,
+        }
+        return Response(response, status=status.HTTP_200_OK)
+
+
+class MovieDetailsView(APIView):
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request):
+        ids_param = request.query_params.get("ids", "")
+        # Sanity check
+        try:
+            keys = TMDBService.parse_keys(ids=ids_param)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Service
+        details, degraded = TMDBService.prefetch(
+            keys=keys, budget=getattr(settings, "TMDB_LATENCY_BUDGET", 1.5)
+        )
+        # Response
+        data = {}
+        for platform, movie_id in keys:
+            response = details.get((platform, movie_id))
+            if response is None:
+                data[f"{platform}:{movie_id}"] = {"degraded": True}
+                continue
+            data[f"{platform}:{movie_id}"] = TMDBService.project(
+                platform=platform, response=response
+            )
+            if (platform, movie_id) in degraded:
+                data[f"{platform}:{movie_id}"]["degraded"] = True
+        return Response({"data": data}, status=status.HTTP_200_OK)
+
+
+class MovieRatingsView(APIView):
+    def get(self, request):
+        ids_param = request.query_params.get("ids", "")
+        # Sanity check
+        try:
+            keys = TMDBService.parse_keys(ids=ids_param, maximum=100)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Service
+        ratings = RatingService.get_many(keys=keys)
+        # Response
+        data = {
+            f"{platform}:{movie_id}": MovieRatingSerializer(rating).data
+            for (platform, movie_id), rating in ratings.items()
+        }
+        return Response({"data": data}, status=status.HTTP_200_OK)
+
+
+class TMDBStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(TMDBService.stats(), status=status.HTTP_200_OK)
+
+
 # class MovieSearch(APIView):
 
 #     def get(self, request):
@@ -2,6 +2,7 @@
     Development settings to get CI pipeline working
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -80,6 +81,22 @@ DATABASES = {
         "NAME": BASE_DIR / "db.sqlite3",
     }
 }
+# List totals, TMDB fetch locks & rate limit go through this cache. Process-local
+# by default : list totals are then counted on every request, locks & rate limit
+# only hold within a process. With several worker processes, use a shared backend,
+# e.g. CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache
+# CACHE_LOCATION=marcus_cache (then `python manage.py createcachetable`). Limiting
+# the TMDB rate across workers needs an atomic incr : Redis or Memcached, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# CACHE_LOCATION=redis://127.0.0.1:6379
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -94,4 +111,31 @@ AUTH_PASSWORD_VALIDATORS = [
         "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
     },
 ]
-TMDB_API_KEY = "34e2e08fed7af733b62f781d945c6a7c"
+TMDB_API_KEY = os.environ.get("TMDB_API_KEY", "34e2e08fed7af733b62f781d945c6a7c")
+TMDB_BASE_URL = os.environ.get("TMDB_BASE_URL", "https://api.themoviedb.org")
+TMDB_LANGUAGE = "fr"
+TMDB_CACHE_TTL = 60 * 60 * 24
+TMDB_CACHE_STALE_TTL = 60 * 60 * 24 * 7
+TMDB_MAX_WORKERS = 8
+TMDB_LOCK_TIMEOUT = 10
+TMDB_CONNECT_TIMEOUT = 2
+TMDB_READ_TIMEOUT = 5
+TMDB_LATENCY_BUDGET = 1.5
+TMDB_BREAKER_THRESHOLD = 5
+TMDB_BREAKER_RESET_TIMEOUT = 30
+TMDB_POOL_SIZE = 10
+TMDB_RETRIES = 2
+TMDB_RETRY_BACKOFF = 0.3
+TMDB_RATE_LIMIT = 40
+TMDB_RATE_BURST = 10
+TMDB_RATE_MAX_WAIT = 1
+
+# Seconds a list total is cached with a shared CACHES (dropped earlier on writes
+# through the services)
+COUNT_CACHE_TTL = 300
+
+# Export jobs : files written by the export_worker command, removed after EXPORT_TTL
+# seconds. Running jobs not finished after EXPORT_TIMEOUT seconds are failed.
+EXPORT_ROOT = Path(os.environ.get("EXPORT_ROOT", BASE_DIR / "exports"))
+EXPORT_TTL = 60 * 60 * 24
+EXPORT_TIMEOUT = 60 * 10
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from marcus_music.models import Critic, Masterpiece, MusicBaseModel, Playlist, Vote
+
+
+class Command(BaseCommand):
+    help = (
+        "Set the kind of music entries created before it, so (user, album_id) is "
+        "unique per table. Duplicates (newer rows) are reported and left unset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        for model in (Masterpiece, Critic, Vote, Playlist):
+            seen = set(
+                model.objects.exclude(kind=None).values_list("user_id", "album_id")
+            )
+            pks = []
+            duplicates = 0
+            rows = (
+                model.objects.filter(kind=None)
+                .order_by("created_at")
+                .values_list("pk", "user_id", "album_id")
+            )
+            for pk, user_id, album_id in rows.iterator(chunk_size=batch_size):
+                if (user_id, album_id) in seen:
+                    duplicates += 1
+                    continue
+                seen.add((user_id, album_id))
+                pks.append(pk)
+            for index in range(0, len(pks), batch_size):
+                MusicBaseModel.objects.filter(
+                    pk__in=pks[index : index + batch_size]
+                ).update(kind=model.KIND)
+            self.stdout.write(
+                f"{model.__name__} : {len(pks)} rows set, {duplicates} duplicates"
+            )
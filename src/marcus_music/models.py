@@ -3,8 +3,37 @@ from django.db import models
 from django.conf import settings
 
 
+class KindField(models.CharField):
+    """
+    Child table of a row, set from its model KIND on insert
+    (save() & the services' raw INSERT alike)
+    """
+
+    def pre_save(self, model_instance, add):
+        if add and getattr(model_instance, self.attname) is None:
+            setattr(model_instance, self.attname, model_instance.KIND)
+        return super().pre_save(model_instance, add)
+
+
 class MusicBaseModel(models.Model):
+    # Columns read by the list endpoints (author loaded in the same query)
+    LIST_FIELDS = (
+        "created_at",
+        "album_id",
+        "album_name",
+        "artist_id",
+        "artist_name",
+        "image_url",
+        "user__username",
+    )
+
+    # Child table of the row ("masterpiece", "critic", "vote", "playlist")
+    KIND = None
+
     id = models.UUIDField(primary_key=True, editable=False, default=uuid.uuid4)
+    # (user, album_id) is unique per child table. Null on rows created before
+    # it (see backfill_music_kinds command)
+    kind = KindField(max_length=20, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True
@@ -15,19 +44,44 @@ class MusicBaseModel(models.Model):
     artist_name = models.CharField(max_length=100)
     image_url = models.CharField(max_length=100)
     genders = models.CharField(max_length=1000)
+    # Normalized genders (indexed filter), see reindex_tags command
+    tag_index = models.ManyToManyField(
+        "marcus.Tag", related_name="music_entries", blank=True
+    )
+
+    class Meta:
+        # Multi-table inheritance : created_at lives here, apart from Vote.value
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "album_id", "kind"], name="music_unique_user_album"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="music_user_created_idx"),
+            models.Index(fields=["-created_at"], name="music_created_idx"),
+            models.Index(fields=["album_id"], name="music_album_idx"),
+            models.Index(fields=["artist_id"], name="music_artist_idx"),
+        ]
 
 
 class Masterpiece(MusicBaseModel):
-    pass
+    KIND = "masterpiece"
 
 
 class Critic(MusicBaseModel):
+    KIND = "critic"
+
     content = models.CharField(max_length=2000)
 
 
 class Vote(MusicBaseModel):
+    KIND = "vote"
+
     value = models.FloatField()
 
+    class Meta:
+        indexes = [models.Index(fields=["value"], name="music_vote_value_idx")]
+
 
 class Playlist(MusicBaseModel):
-    pass
+    KIND = "playlist"
@@ -1,10 +1,12 @@
 from rest_framework import status
 from django.contrib.auth.models import User
+from django.db import transaction
 
-import io
+import tempfile
 import xlsxwriter
 
 from .models import Critic, Masterpiece, Playlist, Vote
+from marcus.services import SearchService, ToolkitService, UserStatsService
 
 
 class MasterpieceService:
@@ -17,13 +19,16 @@ class MasterpieceService:
         """
         Paginated list (optional : by user)
         """
+        rows = Masterpiece.objects.select_related("user").only(
+            *Masterpiece.LIST_FIELDS, "genders"
+        )
         range = 10
         if not user:
-            masterpieces = Masterpiece.objects.all().order_by("-created_at")
+            masterpieces = rows.order_by("-created_at")
         else:
             if not page:
                 range = None
-            masterpieces = Masterpiece.objects.filter(user=user).order_by("-created_at")
+            masterpieces = rows.filter(user=user).order_by("-created_at")
         return masterpieces, range
 
     @staticmethod
@@ -39,14 +44,19 @@ class MasterpieceService:
         """
         Create if (user & album_id) does not exist
         """
-        vote, created = Masterpiece.objects.get_or_create(
-            user=user,
-            album_id=album_id,
-            album_name=album_name,
-            artist_id=artist_id,
-            artist_name=artist_name,
-            image_url=image_url,
-        )
+        with transaction.atomic():
+            vote = Masterpiece(
+                user=user,
+                album_id=album_id,
+                album_name=album_name,
+                artist_id=artist_id,
+                artist_name=artist_name,
+                image_url=image_url,
+            )
+            created = ToolkitService.insert_ignore(obj=vote)
+            if created:
+                UserStatsService.increment(user=user, masterpieces=1)
+                ToolkitService.forget_counts(model=Masterpiece)
         if not created:
             return {
                 "error": f"Album {vote.album_id} {vote.album_name} already exists in Masterpiece."
@@ -61,8 +71,11 @@ class MasterpieceService:
         Delete a row by album_id (called by user)
         """
         try:
-            masterpiece = Masterpiece.objects.get(user=user, id=id)
-            masterpiece.delete()
+            with transaction.atomic():
+                masterpiece = Masterpiece.objects.get(user=user, id=id)
+                masterpiece.delete()
+                UserStatsService.increment(user=user, masterpieces=-1)
+                ToolkitService.forget_counts(model=Masterpiece)
             return 204
         except Exception as e:
             print(e)
@@ -75,18 +88,27 @@ class CriticService:
     """
 
     @staticmethod
-    def export(*, user: int):
-        critics = Critic.objects.all().order_by("-created_at")
+    def export(*, user: int, chunk_size: int = 2000):
+        """
+        Critics of user as an xlsx file (temporary file, rewound), written row
+        by row : memory stays flat whatever the number of critics
+        """
+        critics = (
+            Critic.objects.filter(user=user)
+            .only("album_name", "artist_name", "content", "created_at")
+            .order_by("-created_at")
+        )
 
-        buffer = io.BytesIO()
-        workbook = xlsxwriter.Workbook(buffer)
+        document = tempfile.TemporaryFile()
+        workbook = xlsxwriter.Workbook(document, {"constant_memory": True})
         worksheet = workbook.add_worksheet()
 
         headers = ["ID", "Album", "Artiste", "Critique", "Date d'ajout"]
         for col_num, header in enumerate(headers):
             worksheet.write(0, col_num, header)
 
-        for row_num, critic in enumerate(critics.filter(user=user), start=1):
+        rows = critics.iterator(chunk_size=chunk_size)
+        for row_num, critic in enumerate(rows, start=1):
             worksheet.write(row_num, 0, str(critic.id))
             worksheet.write(row_num, 1, critic.album_name)
             worksheet.write(row_num, 2, critic.artist_name)
@@ -94,22 +116,25 @@ class CriticService:
             worksheet.write(row_num, 4, critic.created_at.strftime("%d-%m-%Y"))
 
         workbook.close()
-        buffer.seek(0)
+        document.seek(0)
 
-        return buffer
+        return document
 
     @staticmethod
     def list(*, user: int, page: int, artist_id: str):
         """
         Paginated list (optional : by user)
         """
+        rows = Critic.objects.select_related("user").only(
+            *Critic.LIST_FIELDS, "content"
+        )
         range = 10 if page else None
         if user:
-            critics = Critic.objects.filter(user=user).order_by("-created_at")
+            critics = rows.filter(user=user).order_by("-created_at")
         elif artist_id:
-            critics = Critic.objects.filter(artist_id=artist_id)
+            critics = rows.filter(artist_id=artist_id)
         else:
-            critics = Critic.objects.all().order_by("-created_at")
+            critics = rows.order_by("-created_at")
         return critics, range
 
     @staticmethod
@@ -126,17 +151,21 @@ class CriticService:
         """
         Create if (user & album_id) does not exist
         """
-        critic, created = Critic.objects.get_or_create(
-            user=user,
-            album_id=album_id,
-            defaults={
-                "album_name": album_name,
-                "content": content,
-                "artist_id": artist_id,
-                "artist_name": artist_name,
-                "image_url": image_url,
-            },
-        )
+        with transaction.atomic():
+            critic = Critic(
+                user=user,
+                album_id=album_id,
+                album_name=album_name,
+                content=content,
+                artist_id=artist_id,
+                artist_name=artist_name,
+                image_url=image_url,
+            )
+            created = ToolkitService.insert_ignore(obj=critic)
+            if created:
+                UserStatsService.increment(user=user, critics=1)
+                ToolkitService.forget_counts(model=Critic)
+                SearchService.index(kind="music", critics=[critic])
         if not created:
             return {
                 "error": f"Album {critic.album_id} {critic.album_name} already exists in Critic."
@@ -151,8 +180,13 @@ class CriticService:
         Delete a row by id (called by user)
         """
         try:
-            critic = Critic.objects.get(user=user, id=id)
-            critic.delete()
+            with transaction.atomic():
+                critic = Critic.objects.get(user=user, id=id)
+                # Before delete(), which clears the pk
+                SearchService.unindex(critics=[critic])
+                critic.delete()
+                UserStatsService.increment(user=user, critics=-1)
+                ToolkitService.forget_counts(model=Critic)
             return 204
         except Exception as e:
             print(e)
@@ -169,21 +203,20 @@ class VoteService:
         """
         Paginated list (optional : by user)
         """
+        rows = Vote.objects.select_related("user").only(*Vote.LIST_FIELDS, "value")
         range = 10 if page else None
         if user:
             if stars:
-                votes = Vote.objects.filter(user=user, value=stars).order_by(
-                    "-created_at"
-                )
+                votes = rows.filter(user=user, value=stars).order_by("-created_at")
             else:
-                votes = Vote.objects.filter(user=user).order_by("-created_at")
+                votes = rows.filter(user=user).order_by("-created_at")
         elif artist_id:
-            votes = Vote.objects.filter(artist_id=artist_id)
+            votes = rows.filter(artist_id=artist_id)
         elif stars:
-            votes = Vote.objects.filter(value=stars).order_by("-created_at")
+            votes = rows.filter(value=stars).order_by("-created_at")
             print(votes)
         else:
-            votes = Vote.objects.all().order_by("-created_at")
+            votes = rows.order_by("-created_at")
         return votes, range
 
     @staticmethod
@@ -200,15 +233,20 @@ class VoteService:
         """
         Create if (user & album_id) does not exist
         """
-        critic, created = Vote.objects.get_or_create(
-            user=user,
-            album_id=album_id,
-            album_name=album_name,
-            value=value,
-            artist_id=artist_id,
-            artist_name=artist_name,
-            image_url=image_url,
-        )
+        with transaction.atomic():
+            critic = Vote(
+                user=user,
+                album_id=album_id,
+                album_name=album_name,
+                value=value,
+                artist_id=artist_id,
+                artist_name=artist_name,
+                image_url=image_url,
+            )
+            created = ToolkitService.insert_ignore(obj=critic)
+            if created:
+                UserStatsService.increment(user=user, votes=1)
+                ToolkitService.forget_counts(model=Vote)
         if not created:
             return {
                 "error": f"Album {critic.album_id} {critic.album_name} already exists in Vote."
@@ -233,8 +271,11 @@ class VoteService:
         Delete a row by id (called by user)
         """
         try:
-            critic = Vote.objects.get(user=user, id=id)
-            critic.delete()
+            with transaction.atomic():
+                critic = Vote.objects.get(user=user, id=id)
+                critic.delete()
+                UserStatsService.increment(user=user, votes=-1)
+                ToolkitService.forget_counts(model=Vote)
             return 204
         except Exception as e:
             print(e)
@@ -251,13 +292,16 @@ class PlaylistService:
         """
         Paginated list (optional : by user)
         """
+        rows = Playlist.objects.select_related("user").only(
+            *Playlist.LIST_FIELDS, "genders"
+        )
         range = 10
         if not user:
-            critics = Playlist.objects.all().order_by("-created_at")
+            critics = rows.order_by("-created_at")
         else:
             if not page:
                 range = None
-            critics = Playlist.objects.filter(user=user).order_by("-created_at")
+            critics = rows.filter(user=user).order_by("-created_at")
         return critics, range
 
     @staticmethod
@@ -273,14 +317,19 @@ class PlaylistService:
         """
         Create if (user & album_id) does not exist
         """
-        critic, created = Playlist.objects.get_or_create(
-            user=user,
-            album_id=album_id,
-            album_name=album_name,
-            artist_id=artist_id,
-            artist_name=artist_name,
-            image_url=image_url,
-        )
+        with transaction.atomic():
+            critic = Playlist(
+                user=user,
+                album_id=album_id,
+                album_name=album_name,
+                artist_id=artist_id,
+                artist_name=artist_name,
+                image_url=image_url,
+            )
+            created = ToolkitService.insert_ignore(obj=critic)
+            if created:
+                UserStatsService.increment(user=user, watchlists=1)
+                ToolkitService.forget_counts(model=Playlist)
         if not created:
             return {
                 "error": f"Album {critic.album_name} already exists in Playlist."
@@ -295,8 +344,11 @@ class PlaylistService:
         Delete a row by id (called by user)
         """
         try:
-            critic = Playlist.objects.get(user=user, id=id)
-            critic.delete()
+            with transaction.atomic():
+                critic = Playlist.objects.get(user=user, id=id)
+                critic.delete()
+                UserStatsService.increment(user=user, watchlists=-1)
+                ToolkitService.forget_counts(model=Playlist)
             return 204
         except Exception as e:
             print(e)
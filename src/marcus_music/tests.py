@@ -1,8 +1,20 @@
+import io
+import zipfile
+
 from django.urls import reverse
 from django.contrib.auth.models import User
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from marcus.models import UserStats
+
+from .models import Critic, Masterpiece, MusicBaseModel, Playlist, Vote
 from .services import CriticService, MasterpieceService, VoteService, PlaylistService
 
 
@@ -161,6 +173,32 @@ class MusicCriticTest(TestCase):
         status_code = self.service.delete(user=self.user, id=vote_id)
         self.assertEqual(status_code, 204)
 
+    def test_critic_export(self):
+        other = User.objects.create_user(username="otheruser")
+        for index, user in enumerate((self.user, self.user, other)):
+            Critic.objects.create(
+                user=user,
+                album_id=str(index),
+                album_name=f"album {index}",
+                content=f"critic {index}",
+                artist_id="1",
+                artist_name="artist name",
+                image_url="https://url.com",
+            )
+        response = self.client.get(
+            reverse("music_critics_export"), {"user_id": self.user.id}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        document = b"".join(response.streaming_content)
+        self.assertEqual(int(response["Content-Length"]), len(document))
+        with zipfile.ZipFile(io.BytesIO(document)) as archive:
+            sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+        # Header + the user's critics, newest first
+        self.assertEqual(sheet.count("<row "), 3)
+        self.assertLess(sheet.index("critic 1"), sheet.index("critic 0"))
+        self.assertNotIn("critic 2", sheet)
+
 
 class MusicMasterpieceTest(TestCase):
     def setUp(self):
@@ -216,6 +254,16 @@ class MusicMasterpieceTest(TestCase):
             image_url="http://url.com",
         )
         self.assertEqual(status_code, 400)
+        # Same album, other details : still the same album
+        _, status_code = self.service.create(
+            user=self.user,
+            album_id="1",
+            album_name="album name (remastered)",
+            artist_id="1",
+            artist_name="artist name",
+            image_url="http://url.com",
+        )
+        self.assertEqual(status_code, 400)
 
         # list()
         list, _ = self.service.list(page=None, user=self.user)
@@ -290,3 +338,153 @@ class MusicPlaylistTest(TestCase):
         vote_id = list[0].id
         status_code = self.service.delete(user=self.user, id=vote_id)
         self.assertEqual(status_code, 204)
+
+
+class MusicUniqueWriteTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser")
+        UserStats.objects.create(user=self.user)
+        self.fields = {
+            "user": self.user,
+            "album_id": "1",
+            "album_name": "album name",
+            "artist_id": "1",
+            "artist_name": "artist name",
+            "image_url": "https://url.com",
+        }
+
+    def test_create_statements(self):
+        for status_code in (201, 400):
+            with CaptureQueriesContext(connection) as queries:
+                _, code = MasterpieceService.create(**self.fields)
+            self.assertEqual(code, status_code)
+            tables = [
+                query["sql"] for query in queries if '"marcus_music_' in query["sql"]
+            ]
+            # Parent INSERT ... ON CONFLICT, then the child row if inserted
+            self.assertTrue(tables[0].startswith("INSERT"))
+            self.assertEqual(len(tables), 2 if status_code == 201 else 1)
+        self.assertEqual(Masterpiece.objects.get().kind, "masterpiece")
+
+    def test_unique_per_kind(self):
+        _, status_code = VoteService.create(value=4, **self.fields)
+        self.assertEqual(status_code, 201)
+        _, status_code = CriticService.create(content="critic", **self.fields)
+        self.assertEqual(status_code, 201)
+        _, status_code = VoteService.create(value=2, **self.fields)
+        self.assertEqual(status_code, 400)
+        self.assertEqual(Vote.objects.get().value, 4)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Vote.objects.create(value=1, **self.fields)
+
+    def test_backfill_music_kinds(self):
+        Masterpiece.objects.create(**self.fields)
+        Masterpiece.objects.create(**{**self.fields, "album_id": "2"})
+        Vote.objects.create(value=3, **self.fields)
+        MusicBaseModel.objects.update(kind=None)
+        # Duplicate allowed while kinds are unset
+        Masterpiece.objects.create(**self.fields)
+        MusicBaseModel.objects.update(kind=None)
+
+        out = io.StringIO()
+        call_command("backfill_music_kinds", "--batch-size", "1", stdout=out)
+        self.assertIn("Masterpiece : 2 rows set, 1 duplicates", out.getvalue())
+        self.assertIn("Vote : 1 rows set, 0 duplicates", out.getvalue())
+        self.assertEqual(Masterpiece.objects.filter(kind=None).count(), 1)
+
+
+class MusicListQueriesTest(TestCase):
+    def setUp(self):
+        users = [
+            User.objects.create_user(username=f"author{index}") for index in range(3)
+        ]
+        for index in range(12):
+            fields = {
+                "user": users[index % 3],
+                "album_id": str(index),
+                "album_name": f"album {index}",
+                "artist_id": "1",
+                "artist_name": "artist name",
+                "image_url": "https://url.com",
+                "genders": "Rock",
+            }
+            Masterpiece.objects.create(**fields)
+            Playlist.objects.create(**fields)
+            Vote.objects.create(value=4, **fields)
+            Critic.objects.create(content="critic", **fields)
+        self.user = users[0]
+
+    def test_list_query_count(self):
+        # Count (if paginated) + rows, whatever the number of rows and authors
+        for name in (
+            "music_masterpieces",
+            "music_playlists",
+            "music_votes",
+            "music_critics",
+        ):
+            for params, queries in (({"page": 1}, 2), ({"user_id": self.user.id}, 1)):
+                cache.clear()
+                with self.subTest(endpoint=name, **params), self.assertNumQueries(
+                    queries
+                ):
+                    response = self.client.get(reverse(name), params)
+                self.assertEqual(
+                    response.json()["data"][0]["user"]["username"][:6], "author"
+                )
+
+
+class MusicCursorPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser")
+        for index in range(25):
+            Playlist.objects.create(
+                user=self.user,
+                album_id=str(index),
+                album_name="album name",
+                artist_id="1",
+                artist_name="artist name",
+                image_url="https://url.com",
+                genders="Rock",
+            )
+
+    def test_cursor_pages(self):
+        # User libraries are not paginated, except in cursor mode
+        params = {"cursor": "", "user_id": self.user.id}
+        album_ids = []
+        while True:
+            with self.assertNumQueries(1):
+                data = self.client.get(reverse("music_playlists"), params).json()
+            self.assertLessEqual(len(data["data"]), 20)
+            album_ids += [playlist["album_id"] for playlist in data["data"]]
+            if data["is_last_page"]:
+                break
+            params["cursor"] = data["next_cursor"]
+        self.assertEqual(sorted(album_ids, key=int), [str(i) for i in range(25)])
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite query plans")
+class MusicListQueryPlanTest(TestCase):
+    def test_list_services_use_indexes(self):
+        # Filters & sort on the shared parent table (multi-table inheritance)
+        lists = [
+            MasterpieceService.list(user=None, page=1),
+            MasterpieceService.list(user=1, page=None),
+            PlaylistService.list(user=None, page=1),
+            PlaylistService.list(user=1, page=None),
+            CriticService.list(user=1, page=1, artist_id=None),
+            CriticService.list(user=None, page=1, artist_id="1"),
+            CriticService.list(user=None, page=1, artist_id=None),
+            VoteService.list(user=1, page=1, artist_id=None, stars=4),
+            VoteService.list(user=None, page=1, artist_id="1", stars=None),
+            VoteService.list(user=None, page=1, artist_id=None, stars=None),
+        ]
+        for queryset, _ in lists:
+            with self.subTest(query=str(queryset.query)):
+                self.assertRegex(
+                    queryset.explain(),
+                    r"(SCAN|SEARCH) marcus_music_musicbasemodel USING INDEX music_",
+                )
+
+    def test_votes_by_value_use_index(self):
+        votes, _ = VoteService.list(user=None, page=1, artist_id=None, stars=4)
+        self.assertIn("USING INDEX music_vote_value_idx", votes.explain())
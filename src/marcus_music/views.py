@@ -43,19 +43,13 @@ class BaseView(APIView):
         objects, range = self.service.list(
             user=user_param, page=page_param, artist_id=artist_param
         )
-        page, has_next, start_index, end_index, total_objects = ToolkitService.paginate(
-            page_number=page_param, range=range, objects=objects
+        page, pagination = ToolkitService.page(
+            params=request.query_params, range=range, objects=objects
         )
         # Serialize
         serialized_data = self.retrieve_serializer(page, many=True)
         # Response
-        response = {
-            "total": total_objects,
-            "from": start_index,
-            "to": end_index,
-            "is_last_page": not has_next,
-            "data": serialized_data.data,
-        }
+        response = {**pagination, "data": serialized_data.data}
         return Response(response, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -106,19 +100,13 @@ class MasterpiecesView(BaseView):
                 return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         # Services (list & paginate)
         objects, range = self.service.list(user=user_param, page=page_param)
-        page, has_next, start_index, end_index, total_objects = ToolkitService.paginate(
-            page_number=page_param, range=range, objects=objects
+        page, pagination = ToolkitService.page(
+            params=request.query_params, range=range, objects=objects
         )
         # Serialize
         serialized_data = self.retrieve_serializer(page, many=True)
         # Response
-        response = {
-            "total": total_objects,
-            "from": start_index,
-            "to": end_index,
-            "is_last_page": not has_next,
-            "data": serialized_data.data,
-        }
+        response = {**pagination, "data": serialized_data.data}
         return Response(response, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -180,19 +168,13 @@ class CriticsView(BaseView):
         objects, range = self.service.list(
             user=user_param, page=page_param, artist_id=artist_param
         )
-        page, has_next, start_index, end_index, total_objects = ToolkitService.paginate(
-            page_number=page_param, range=range, objects=objects
+        page, pagination = ToolkitService.page(
+            params=request.query_params, range=range, objects=objects
         )
         # Serialize
         serialized_data = self.retrieve_serializer(page, many=True)
         # Response
-        response = {
-            "total": total_objects,
-            "from": start_index,
-            "to": end_index,
-            "is_last_page": not has_next,
-            "data": serialized_data.data,
-        }
+        response = {**pagination, "data": serialized_data.data}
         return Response(response, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -239,19 +221,13 @@ class VotesView(BaseView):
         objects, range = self.service.list(
             user=user_param, page=page_param, artist_id=artist_param, stars=stars_param
         )
-        page, has_next, start_index, end_index, total_objects = ToolkitService.paginate(
-            page_number=page_param, range=range, objects=objects
+        page, pagination = ToolkitService.page(
+            params=request.query_params, range=range, objects=objects
         )
         # Serialize
         serialized_data = self.retrieve_serializer(page, many=True)
         # Response
-        response = {
-            "total": total_objects,
-            "from": start_index,
-            "to": end_index,
-            "is_last_page": not has_next,
-            "data": serialized_data.data,
-        }
+        response = {**pagination, "data": serialized_data.data}
         return Response(response, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -302,19 +278,13 @@ class PlaylistsView(BaseView):
                 return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         # Services (list & paginate)
         objects, range = self.service.list(user=user_param, page=page_param)
-        page, has_next, start_index, end_index, total_objects = ToolkitService.paginate(
-            page_number=page_param, range=range, objects=objects
+        page, pagination = ToolkitService.page(
+            params=request.query_params, range=range, objects=objects
         )
         # Serialize
         serialized_data = self.retrieve_serializer(page, many=True)
         # Response
-        response = {
-            "total": total_objects,
-            "from": start_index,
-            "to": end_index,
-            "is_last_page": not has_next,
-            "data": serialized_data.data,
-        }
+        response = {**pagination, "data": serialized_data.data}
         return Response(response, status=status.HTTP_200_OK)
 
     def post(self, request):